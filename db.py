@@ -86,6 +86,16 @@ def init_schema() -> None:
             """
         )
 
+        # אינדקס חלקי לתשלומים ממתינים – דפדוף keyset ב-/pending לפי (created_at, id)
+        cur.execute("DROP INDEX IF EXISTS idx_payments_pending_id;")
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_payments_pending_created
+                ON payments (created_at DESC, id DESC)
+                WHERE status = 'pending';
+            """
+        )
+
         # users – רשימת משתמשים
         cur.execute(
             """
@@ -211,6 +221,39 @@ def update_payment_status(user_id: int, status: str, reason: Optional[str]) -> N
         )
 
 
+def update_payment_statuses(updates: List[tuple]) -> None:
+    """
+    כמו update_payment_status, לכמה משתמשים ב-UPDATE אחד.
+    updates: רשימת (user_id, status, reason) – משתמש אחד לכל היותר ברשימה.
+    """
+    if not updates:
+        return
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            logger.warning("update_payment_statuses called without DB.")
+            return
+        psycopg2.extras.execute_values(
+            cur,
+            """
+            UPDATE payments AS p
+            SET status = v.status,
+                reason = v.reason,
+                updated_at = NOW()
+            FROM (VALUES %s) AS v(user_id, status, reason)
+            WHERE p.id = (
+                SELECT id
+                FROM payments
+                WHERE user_id = v.user_id
+                ORDER BY created_at DESC
+                LIMIT 1
+            );
+            """,
+            updates,
+            template="(%s::bigint, %s::text, %s::text)",
+            page_size=len(updates),
+        )
+
+
 # =========================
 # users / referrals – למערכת ניקוד ו-Leaderboard
 # =========================
@@ -499,6 +542,9 @@ except NameError:  # pragma: no cover
 
 def _init_schema_slhnet():
     conn = get_conn()
+    if conn is None:
+        logger.warning("_init_schema_slhnet called without DB.")
+        return
     with conn:
         with conn.cursor() as cur:
             cur.execute(
@@ -773,13 +819,8 @@ def list_recent_posts(limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
         }
         for r in rows
     ]
-try:
-    _init_schema_slhnet()
-except Exception as e:
-    try:
-        logger.error("SLHNET: failed to ensure extra tables: %s", e)
-    except Exception:
-        pass
+# הטבלאות הנוספות נוצרות דרך init_schema() (ראה העטיפה למעלה) באתחול
+# האפליקציה – לא בזמן import, כדי לא להריץ את ה-DDL פעמיים בכל עליית תהליך.
 
 # ================================
 # SLHNET extra tables & helpers
@@ -934,21 +975,42 @@ def has_approved_payment(user_id: int) -> bool:
         return bool(row[0]) if row else False
 
 
-def get_pending_payments(limit: int = 20) -> List[Dict[str, Any]]:
-    """מחזיר רשימת תשלומים במצב 'pending' לתצוגה באדמין."""
+def get_pending_payments(
+    limit: int = 20, before_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    מחזיר רשימת תשלומים במצב 'pending' לתצוגה באדמין, מהחדש לישן (created_at).
+    before_id – דפדוף keyset: id של השורה האחרונה בעמוד הקודם; העמוד הבא מתחיל
+    אחריה לפי (created_at, id), כך ש-id רק שובר שוויון בין זמנים זהים.
+    """
     with db_cursor() as (conn, cur):
         if cur is None:
             return []
-        cur.execute(
-            """
-            SELECT id, user_id, username, pay_method, status, created_at
-            FROM payments
-            WHERE status = 'pending'
-            ORDER BY created_at DESC
-            LIMIT %s
-            """,
-            (limit,),
-        )
+        if before_id is None:
+            cur.execute(
+                """
+                SELECT id, user_id, username, pay_method, status, created_at
+                FROM payments
+                WHERE status = 'pending'
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+                """,
+                (limit,),
+            )
+        else:
+            cur.execute(
+                """
+                SELECT id, user_id, username, pay_method, status, created_at
+                FROM payments
+                WHERE status = 'pending'
+                  AND (created_at, id) < (
+                      SELECT created_at, id FROM payments WHERE id = %s
+                  )
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+                """,
+                (before_id, limit),
+            )
         rows = cur.fetchall()
         return [
             {
@@ -1,10 +1,23 @@
 import os
+import re
 import json
+import time
+import random
+import inspect
+import importlib.util
+import queue
+import threading
+import atexit
+import gzip
+import concurrent.futures
+import asyncio
 import logging
+import logging.handlers
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-from decimal import Decimal, InvalidOperation
-from datetime import datetime
+from functools import lru_cache, partial
+from typing import Optional, Dict, Any, List, Set, Coroutine, Callable
+from decimal import Decimal
+from datetime import datetime, timedelta
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, HTMLResponse, Response
@@ -16,12 +29,19 @@ from pydantic import BaseModel
 
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from telegram import (
     Update,
+    Chat,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     InputFile,
 )
+from telegram.error import RetryAfter
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -38,7 +58,7 @@ from db import (
     get_monthly_payments,
     get_reserve_stats,
     log_payment,
-    update_payment_status,
+    update_payment_statuses,
     has_approved_payment,
     get_pending_payments,
 )
@@ -46,7 +66,7 @@ from db import (
 from slh_internal_wallets import (
     init_internal_wallet_schema,
     ensure_internal_wallet,
-    get_wallet_overview,
+    get_wallet_and_stakes,
     transfer_between_users,
     create_stake_position,
     get_user_stakes,
@@ -54,6 +74,17 @@ from slh_internal_wallets import (
 )
 
 # === Optional routers ===
+try:
+    import h2  # noqa: F401 – נדרש ל-HTTP/2 ב-httpx
+except ImportError:
+    h2 = None
+
+# AIORateLimiter של python-telegram-bot דורש את חבילת aiolimiter (extra rate-limiter)
+if importlib.util.find_spec("aiolimiter") is not None:
+    from telegram.ext import AIORateLimiter
+else:
+    AIORateLimiter = None
+
 try:
     from slh_public_api import router as public_router
 except Exception:
@@ -78,13 +109,28 @@ except Exception:
 # =========================
 # Logging
 # =========================
+# הכתיבה לקובץ הלוג ול-stderr מתבצעת ב-thread נפרד (QueueListener), כך
+# שה-handlers של הבוט לא נחסמים על I/O. ה-QueueHandler מפרמט את ההודעה לפני
+# ההכנסה לתור, ולכן ה-handlers שמאחורי התור נשארים עם פורמט ברירת המחדל.
+# קובץ הלוג מתגלגל (LOG_FILE_MAX_BYTES × LOG_FILE_BACKUPS) כדי לא לגדול בלי גבול.
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.StreamHandler(),
+    logging.handlers.RotatingFileHandler(
+        "slhnet_bot.log",
+        maxBytes=int(os.getenv("LOG_FILE_MAX_BYTES", "50000000")),
+        backupCount=int(os.getenv("LOG_FILE_BACKUPS", "5")),
+        encoding="utf-8",
+    ),
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("slhnet_bot.log", encoding="utf-8"),
-    ],
+    handlers=[logging.handlers.QueueHandler(_log_queue)],
 )
 logger = logging.getLogger("slhnet")
 
@@ -92,10 +138,43 @@ logger = logging.getLogger("slhnet")
 # =========================
 # FastAPI app
 # =========================
+def _json_default(obj: Any) -> Any:
+    """
+    טיפוסים שה-serializer לא מכיר (Decimal/datetime משורות ה-DB) –
+    אותה המרה ש-jsonable_encoder של FastAPI עושה, כך שהפלט לא משתנה.
+    """
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class DefaultJSONResponse(JSONResponse):
+    """
+    תשובות JSON מסורלזות ב-orjson כשהוא מותקן (מהיר יותר מ-json של הספרייה הסטנדרטית).
+    מקבל Decimal/datetime ישירות, כך שנקודות חמות יכולות להחזיר אותו בלי
+    לעבור דרך jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(
+                content, default=_json_default, option=orjson.OPT_NON_STR_KEYS
+            )
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=_json_default,
+        ).encode("utf-8")
+
 app = FastAPI(
     title="SLHNET Gateway Bot",
     description="בוט קהילה ושער API עבור SLHNET",
     version="2.2.0",
+    default_response_class=DefaultJSONResponse,
 )
 
 # CORS
@@ -158,6 +237,24 @@ PROFILE_FILE = DATA_DIR / "profiles.json"
 MESSAGES_FILE = BASE_DIR / "bot_messages_slhnet.txt"
 
 
+# cache של קובץ ההפניות בזיכרון – נטען מחדש רק כשה-mtime של הקובץ משתנה.
+# הנתונים המוחזרים משותפים: קוראים לא משנים אותם, והכותב היחיד הוא register_referral_async.
+_REFERRALS_CACHE: Dict[str, Any] = {"mtime": None, "data": None}
+# מסדר רישום משתמשים חדשים מתוך handlers (טעינה, עדכון וכתיבה לקובץ ה-tmp)
+_referrals_write_lock = asyncio.Lock()
+
+
+_REF_FILE_MISSING = -1
+
+
+def _referrals_mtime() -> int:
+    """st_mtime_ns של קובץ ההפניות, או _REF_FILE_MISSING אם הוא עוד לא קיים."""
+    try:
+        return REF_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return _REF_FILE_MISSING
+
+
 def load_referrals() -> Dict[str, Any]:
     """
     טוען את קובץ ההפניות מהדיסק.
@@ -172,78 +269,130 @@ def load_referrals() -> Dict[str, Any]:
             ...
         },
         "statistics": {
-            "total_users": int
+            "total_users": int,
+            "total_referrals": int
+        },
+        "by_referrer": {
+            "<referrer_id>": ["<telegram_id>", ...]
         }
     }
     """
-    if not REF_FILE.exists():
-        return {"users": {}, "statistics": {"total_users": 0}}
+    mtime = _referrals_mtime()
+    # הקובץ לא השתנה מאז הקריאה האחרונה – מחזירים את מה שכבר פוענח
+    if mtime == _REFERRALS_CACHE["mtime"]:
+        return _REFERRALS_CACHE["data"]
+
+    if mtime == _REF_FILE_MISSING:
+        # גם מבנה ריק נשמר ב-cache, כדי שכל הכותבים יעבדו על אותו אובייקט
+        data = {
+            "users": {},
+            "statistics": {"total_users": 0, "total_referrals": 0},
+            "by_referrer": {},
+        }
+        _REFERRALS_CACHE["mtime"] = mtime
+        _REFERRALS_CACHE["data"] = data
+        return data
 
     try:
-        with REF_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_loads(REF_FILE.read_bytes())
         if "users" not in data:
             data["users"] = {}
         if "statistics" not in data:
             data["statistics"] = {"total_users": len(data["users"])}
+        if "total_referrals" not in data["statistics"]:
+            data["statistics"]["total_referrals"] = sum(
+                u.get("referral_count", 0) for u in data["users"].values()
+            )
+        if "by_referrer" not in data:
+            # קובץ ישן – בונים את האינדקס ההפוך פעם אחת; הוא יישמר בכתיבה הבאה
+            by_referrer: Dict[str, List[str]] = {}
+            for uid, info in data["users"].items():
+                if info.get("referrer"):
+                    by_referrer.setdefault(info["referrer"], []).append(uid)
+            data["by_referrer"] = by_referrer
+        _REFERRALS_CACHE["mtime"] = mtime
+        _REFERRALS_CACHE["data"] = data
         return data
     except Exception as e:
         logger.error(f"Error loading referrals: {e}")
-        return {"users": {}, "statistics": {"total_users": 0}}
+        return {
+            "users": {},
+            "statistics": {"total_users": 0, "total_referrals": 0},
+            "by_referrer": {},
+        }
 
 
-def save_referrals(data: Dict[str, Any]) -> None:
-    """שומר את קובץ ההפניות לדיסק בצורה אטומית ככל האפשר."""
-    try:
-        data["statistics"]["total_users"] = len(data.get("users", {}))
-        tmp_path = REF_FILE.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        tmp_path.replace(REF_FILE)
-    except Exception as e:
-        logger.error(f"Error saving referrals: {e}")
+async def load_referrals_async() -> Dict[str, Any]:
+    """
+    load_referrals ל-handlers אסינכרוניים: כשה-cache תקף מחזירים אותו ישר,
+    ורק קריאה ופענוח של הקובץ מהדיסק רצים ב-thread נפרד, כדי לא לעצור
+    את לולאת האירועים לשאר הצ'אטים.
+    """
+    if _referrals_mtime() == _REFERRALS_CACHE["mtime"]:
+        return _REFERRALS_CACHE["data"]
+    return await asyncio.to_thread(load_referrals)
 
 
-def register_referral(user_id: int, referrer_id: Optional[int] = None) -> None:
+def _write_referrals_file(data: Dict[str, Any], payload: bytes) -> None:
+    """כתיבה אטומית (tmp + replace) של payload מוכן ועדכון ה-cache ל-data."""
+    tmp_path = REF_FILE.with_suffix(".tmp")
+    tmp_path.write_bytes(payload)
+    tmp_path.replace(REF_FILE)
+    _REFERRALS_CACHE["mtime"] = REF_FILE.stat().st_mtime_ns
+    _REFERRALS_CACHE["data"] = data
+
+
+def _apply_referral(
+    data: Dict[str, Any], user_id: int, referrer_id: Optional[int]
+) -> bool:
     """
-    רושם משתמש חדש בקובץ ההפניות.
-    אם referrer_id קיים כבר במערכת – מגדיל לו את מונה ההפניות.
+    מוסיף משתמש חדש ל-data בזיכרון (כולל מונה ואינדקס של המפנה).
+    מחזיר False אם המשתמש כבר רשום – ואז אין מה לשמור.
     """
-    try:
-        data = load_referrals()
-        suid = str(user_id)
-        if suid not in data["users"]:
-            data["users"][suid] = {
-                "referrer": str(referrer_id) if referrer_id else None,
-                "joined_at": datetime.now().isoformat(),
-                "referral_count": 0,
-            }
-            # increment referrer counter if exists
-            if referrer_id:
-                rid = str(referrer_id)
-                if rid in data["users"]:
-                    data["users"][rid]["referral_count"] = (
-                        data["users"][rid].get("referral_count", 0) + 1
-                    )
-            save_referrals(data)
-    except Exception as e:
-        logger.error(f"Error registering referral: {e}")
+    suid = str(user_id)
+    if suid in data["users"]:
+        return False
+    data["users"][suid] = {
+        "referrer": str(referrer_id) if referrer_id else None,
+        "joined_at": datetime.now().isoformat(),
+        "referral_count": 0,
+    }
+    # increment referrer counter if exists
+    if referrer_id:
+        rid = str(referrer_id)
+        data["by_referrer"].setdefault(rid, []).append(suid)
+        if rid in data["users"]:
+            data["users"][rid]["referral_count"] = (
+                data["users"][rid].get("referral_count", 0) + 1
+            )
+            stats = data["statistics"]
+            stats["total_referrals"] = stats.get("total_referrals", 0) + 1
+    data["statistics"]["total_users"] = len(data["users"])
+    return True
 
 
-def get_user_referrals(user_id: int) -> List[int]:
+async def register_referral_async(
+    user_id: int, referrer_id: Optional[int] = None
+) -> None:
     """
-    מחזיר רשימת user_id שהופנו ע״י user_id מסויים.
+    רושם משתמש חדש בקובץ ההפניות (ואם יש לו מפנה – מגדיל את מונה ההפניות שלו).
+    העדכון בזיכרון וה-serialize נעשים בלולאה (אין קוראים מקבילים שרואים dict
+    באמצע שינוי), ורק הכתיבה לדיסק רצה ב-thread. משתמש חדש נרשם תחת _referrals_write_lock, כך שכל הכותבים
+    עובדים על אותו אובייקט ב-cache.
     """
-    data = load_referrals()
-    suid = str(user_id)
-    result: List[int] = []
-    for k, v in data.get("users", {}).items():
-        if v.get("referrer") == suid:
-            try:
-                result.append(int(k))
-            except Exception:
-                continue
-    return result
+    try:
+        data = await load_referrals_async()
+        if str(user_id) in data["users"]:
+            return
+        async with _referrals_write_lock:
+            data = await load_referrals_async()
+            if not _apply_referral(data, user_id, referrer_id):
+                return
+            payload = json_dumps_pretty(data)
+            await asyncio.to_thread(_write_referrals_file, data, payload)
+    except Exception as e:
+        _REFERRALS_CACHE["mtime"] = None
+        logger.error(f"Error registering referral: {e}")
 
 
 # =========================
@@ -254,19 +403,21 @@ def load_profiles() -> Dict[str, Any]:
     if not PROFILE_FILE.exists():
         return {}
     try:
-        with PROFILE_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return json_loads(PROFILE_FILE.read_bytes())
     except Exception as e:
         logger.error(f"Error loading profiles: {e}")
         return {}
 
 
+# load → update → save של הפרופילים רץ ב-threads; הנעילה מונעת דריסת עדכון מקביל
+_profiles_lock = threading.Lock()
+
+
 def save_profiles(data: Dict[str, Any]) -> None:
     """שומר פרופילים לדיסק."""
     try:
         tmp_path = PROFILE_FILE.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_path.write_bytes(json_dumps_pretty(data))
         tmp_path.replace(PROFILE_FILE)
     except Exception as e:
         logger.error(f"Error saving profiles: {e}")
@@ -283,25 +434,35 @@ def upsert_profile(
     זה future-ready כדי שבשלב הבא נוכל לשאול שאלות ולהעמיק בפרופיל.
     """
     try:
-        profiles = load_profiles()
-        suid = str(user_id)
-        profile = profiles.get(suid, {})
-        profile.update(
-            {
-                "user_id": user_id,
-                "username": username,
-                "full_name": full_name,
-                "updated_at": datetime.now().isoformat(),
-            }
-        )
-        if extra:
-            profile.setdefault("extra", {}).update(extra)
-        profiles[suid] = profile
-        save_profiles(profiles)
+        with _profiles_lock:
+            _upsert_profile_locked(user_id, username, full_name, extra)
     except Exception as e:
         logger.error(f"Error upserting profile: {e}")
 
 
+def _upsert_profile_locked(
+    user_id: int,
+    username: Optional[str],
+    full_name: str,
+    extra: Optional[Dict[str, Any]],
+) -> None:
+    profiles = load_profiles()
+    suid = str(user_id)
+    profile = profiles.get(suid, {})
+    profile.update(
+        {
+            "user_id": user_id,
+            "username": username,
+            "full_name": full_name,
+            "updated_at": datetime.now().isoformat(),
+        }
+    )
+    if extra:
+        profile.setdefault("extra", {}).update(extra)
+    profiles[suid] = profile
+    save_profiles(profiles)
+
+
 # =========================
 # On-chain (external) wallets per user (file-based)
 # =========================
@@ -324,8 +485,7 @@ def load_onchain_wallets() -> Dict[str, Any]:
     if not ONCHAIN_FILE.exists():
         return {}
     try:
-        with ONCHAIN_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return json_loads(ONCHAIN_FILE.read_bytes())
     except Exception as e:
         logger.error(f"Error loading on-chain wallets: {e}")
         return {}
@@ -334,8 +494,7 @@ def load_onchain_wallets() -> Dict[str, Any]:
 def save_onchain_wallets(data: Dict[str, Any]) -> None:
     try:
         tmp = ONCHAIN_FILE.with_suffix(".tmp")
-        with tmp.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp.write_bytes(json_dumps_pretty(data))
         tmp.replace(ONCHAIN_FILE)
     except Exception as e:
         logger.error(f"Error saving on-chain wallets: {e}")
@@ -380,6 +539,12 @@ def set_onchain_wallet(
 # =========================
 # Messages file helper
 # =========================
+# בלוקי מלל שכבר נטענו: (block_name, fallback) -> טקסט.
+# מתאפס כשה-mtime של קובץ ההודעות משתנה, כך שעריכת הקובץ נקלטת בלי restart.
+_MESSAGE_BLOCK_CACHE: Dict[tuple, str] = {}
+_message_file_mtime: Optional[int] = None
+
+
 def load_message_block(block_name: str, fallback: str = "") -> str:
     """
     טוען בלוק מלל מתוך bot_messages_slhnet.txt.
@@ -388,34 +553,61 @@ def load_message_block(block_name: str, fallback: str = "") -> str:
     ...
     === END ===
     """
-    if not MESSAGES_FILE.exists():
+    global _message_file_mtime
+    try:
+        mtime = MESSAGES_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
         if fallback:
             return fallback
         return "[שגיאה: קובץ הודעות לא נמצא]"
 
+    if mtime != _message_file_mtime:
+        _MESSAGE_BLOCK_CACHE.clear()
+        _message_file_mtime = mtime
+
+    key = (block_name, fallback)
+    text = _MESSAGE_BLOCK_CACHE.get(key)
+    if text is None:
+        text = _MESSAGE_BLOCK_CACHE[key] = _read_message_block(block_name, fallback)
+    return text
+
+
+def _read_message_block(block_name: str, fallback: str) -> str:
     try:
-        content = MESSAGES_FILE.read_text(encoding="utf-8")
-        lines = content.splitlines()
-        result_lines: List[str] = []
-        in_block = False
-        found_block = False
-
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith("===") and block_name in stripped:
-                in_block = True
-                found_block = True
-                continue
-            if in_block and stripped.startswith("=== END"):
+        # סריקה ברמת bytes: מאתרים את גבולות הבלוק עם bytes.find ומפענחים
+        # UTF-8 רק את הקטע של הבלוק עצמו, במקום לפצל ולעבור על כל שורות הקובץ.
+        raw = MESSAGES_FILE.read_bytes()
+        name = block_name.encode("utf-8")
+
+        header = raw.find(name)
+        while header != -1:
+            line_start = raw.rfind(b"\n", 0, header) + 1
+            if raw[line_start:header].lstrip().startswith(b"==="):
                 break
-            if in_block:
-                result_lines.append(line)
+            header = raw.find(name, header + 1)
 
-        if not found_block and not fallback:
+        if header == -1:
+            if fallback:
+                return fallback
             return f"[שגיאה: בלוק {block_name} לא נמצא]"
-        if not result_lines and fallback:
+
+        body_start = raw.find(b"\n", header)
+        if body_start == -1:
             return fallback
-        return "\n".join(result_lines).strip() or fallback
+        body_start += 1
+
+        body_end = raw.find(b"=== END", body_start)
+        while body_end != -1:
+            line_start = raw.rfind(b"\n", 0, body_end) + 1
+            if not raw[line_start:body_end].strip():
+                body_end = line_start
+                break
+            body_end = raw.find(b"=== END", body_end + 1)
+        if body_end == -1:
+            body_end = len(raw)
+
+        block = raw[body_start:body_end].decode("utf-8")
+        return "\n".join(block.splitlines()).strip() or fallback
     except Exception as e:
         logger.error(f"Error loading message block '{block_name}': {e}")
         return fallback or f"[שגיאה בטעינת בלוק {block_name}]"
@@ -436,6 +628,12 @@ except Exception:
 
 DYNAMIC_CONFIG_FILE = DATA_DIR / "slh_dynamic_config.json"
 
+# דיוק תצוגה/חישוב של כמויות SLH בבוט
+SLH_DISPLAY_QUANTUM = Decimal("0.0001")
+# קבועי Decimal משותפים – Decimal אינו mutable, ואין צורך לבנות אותם מחדש בכל חישוב
+DECIMAL_ZERO = Decimal(0)
+DECIMAL_HUNDRED = Decimal(100)
+
 
 def load_dynamic_config() -> Dict[str, Any]:
     """
@@ -454,8 +652,7 @@ def load_dynamic_config() -> Dict[str, Any]:
     if not DYNAMIC_CONFIG_FILE.exists():
         return base
     try:
-        with DYNAMIC_CONFIG_FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_loads(DYNAMIC_CONFIG_FILE.read_bytes())
         for k in base.keys():
             if k in data:
                 base[k] = data[k]
@@ -468,15 +665,17 @@ def load_dynamic_config() -> Dict[str, Any]:
 def save_dynamic_config(cfg: Dict[str, Any]) -> None:
     try:
         tmp_path = DYNAMIC_CONFIG_FILE.with_suffix(".tmp")
-        with tmp_path.open("w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False, indent=2)
+        tmp_path.write_bytes(json_dumps_pretty(cfg))
         tmp_path.replace(DYNAMIC_CONFIG_FILE)
     except Exception as e:
         logger.error(f"Error saving dynamic SLH config: {e}")
 
 
-def get_current_price_and_entry() -> (Decimal, Decimal):
-    cfg = load_dynamic_config()
+def get_current_price_and_entry(
+    cfg: Optional[Dict[str, Any]] = None,
+) -> (Decimal, Decimal):
+    if cfg is None:
+        cfg = load_dynamic_config()
     try:
         price = Decimal(str(cfg.get("slh_nis_price", float(DEFAULT_SLH_PRICE))))
     except Exception:
@@ -488,15 +687,20 @@ def get_current_price_and_entry() -> (Decimal, Decimal):
     return price, entry
 
 
+# record_mint_amount רץ גם מ-threads (מינט אחרי אישור) – מונע דריסת סכום מקבילה
+_mint_total_lock = threading.Lock()
+
+
 def record_mint_amount(amount_slh: Decimal) -> None:
     try:
-        cfg = load_dynamic_config()
-        current_total = Decimal(str(cfg.get("total_slh_minted", 0.0)))
-        new_total = current_total + amount_slh
-        cfg["total_slh_minted"] = float(new_total)
-        save_dynamic_config(cfg)
+        with _mint_total_lock:
+            cfg = load_dynamic_config()
+            current_total = Decimal(str(cfg.get("total_slh_minted", 0.0)))
+            new_total = current_total + amount_slh
+            cfg["total_slh_minted"] = float(new_total)
+            save_dynamic_config(cfg)
     except Exception as e:
-        logger.error(f"Error recording minted SLH: {e}")
+        logger.error("Error recording minted SLH: %s", e)
 
 
 def compute_slh_for_entry(price_nis: Decimal, entry_nis: Decimal) -> Decimal:
@@ -504,23 +708,16 @@ def compute_slh_for_entry(price_nis: Decimal, entry_nis: Decimal) -> Decimal:
     מחשב כמה SLH מקבלים עבור סכום כניסה מסויים בש"ח.
     """
     if price_nis <= 0:
-        return Decimal("0")
+        return DECIMAL_ZERO
     try:
-        return (entry_nis / price_nis).quantize(Decimal("0.0001"))
+        return (entry_nis / price_nis).quantize(SLH_DISPLAY_QUANTUM)
     except Exception:
-        return Decimal("0")
+        return DECIMAL_ZERO
 
 
 # =========================
 # Pydantic models
 # =========================
-class TelegramWebhookUpdate(BaseModel):
-    update_id: int
-    message: Optional[Dict[str, Any]] = None
-    callback_query: Optional[Dict[str, Any]] = None
-    edited_message: Optional[Dict[str, Any]] = None
-
-
 class HealthResponse(BaseModel):
     status: str
     service: str
@@ -559,15 +756,90 @@ class WalletAPIResponse(BaseModel):
 # =========================
 # Config & helpers
 # =========================
-def is_admin(user_id: int) -> bool:
+_ADMIN_IDS: Optional[frozenset] = None
+
+
+def _load_admin_ids() -> frozenset:
+    """מפענח את ADMIN_OWNER_IDS פעם אחת לכל התהליך ושומר כ-frozenset."""
+    global _ADMIN_IDS
     raw = os.getenv("ADMIN_OWNER_IDS", "")
-    for part in raw.replace(",", " ").split():
-        try:
-            if int(part) == int(user_id):
-                return True
-        except ValueError:
-            continue
-    return False
+    _ADMIN_IDS = frozenset(
+        int(part)
+        for part in raw.replace(",", " ").split()
+        if part.lstrip("-").isdigit()
+    )
+    return _ADMIN_IDS
+
+
+def is_admin(user_id: int) -> bool:
+    admin_ids = _ADMIN_IDS if _ADMIN_IDS is not None else _load_admin_ids()
+    return user_id in admin_ids
+
+
+# cache קצר לסטטוס "יש תשלום מאושר" – נבדק בכל /start, משתנה רק באישור/דחייה
+APPROVED_PAYMENT_TTL_SECONDS = float(os.getenv("APPROVED_PAYMENT_TTL_SECONDS", "300"))
+APPROVED_PAYMENT_CACHE_MAX = 4096
+_approved_payment_cache: Dict[int, tuple] = {}
+
+
+async def has_approved_payment_cached(user_id: int) -> bool:
+    """
+    has_approved_payment עם cache של APPROVED_PAYMENT_TTL_SECONDS.
+    אישור דרך הבוט כותב את התוצאה ישר ל-cache (remember_approved_payment),
+    ודחייה מנקה את הרשומה (forget_approved_payment).
+    בהחטאה השאילתה רצה ב-thread כדי לא לעצור את לולאת האירועים.
+    """
+    now = time.monotonic()
+    hit = _approved_payment_cache.get(user_id)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    value = await run_db(has_approved_payment, user_id)
+    # אם בזמן השאילתה היה אישור/דחייה – לא דורסים את המצב העדכני בתוצאה ישנה
+    if _approved_payment_cache.get(user_id) is hit:
+        _store_approved_payment(user_id, value)
+    return value
+
+
+def _store_approved_payment(user_id: int, value: bool) -> None:
+    if len(_approved_payment_cache) >= APPROVED_PAYMENT_CACHE_MAX:
+        _approved_payment_cache.clear()
+    _approved_payment_cache[user_id] = (
+        time.monotonic() + APPROVED_PAYMENT_TTL_SECONDS,
+        value,
+    )
+
+
+def remember_approved_payment(user_id: int) -> None:
+    _store_approved_payment(user_id, True)
+
+
+def forget_approved_payment(user_id: int) -> None:
+    _approved_payment_cache.pop(user_id, None)
+
+
+# cache קצר לסטטיסטיקות כספיות מה-DB – דשבורד שמתשאל כל כמה שניות ו-/admin
+# מקבלים את אותה תוצאה במקום להריץ את השאילתות מחדש בכל בקשה.
+# אישור/דחייה דרך הבוט מנקים את ה-cache (invalidate_stats_cache).
+STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "15"))
+_stats_cache: Dict[str, tuple] = {}
+
+
+async def get_stats_cached(fetch: Callable[[], Any]) -> Any:
+    """
+    מריץ פונקציית סטטיסטיקה סינכרונית (get_reserve_stats וכו') ב-thread,
+    ושומר את התוצאה ל-STATS_CACHE_TTL_SECONDS לפי שם הפונקציה.
+    """
+    now = time.monotonic()
+    hit = _stats_cache.get(fetch.__name__)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    value = await run_db(fetch) or {}
+    _stats_cache[fetch.__name__] = (time.monotonic() + STATS_CACHE_TTL_SECONDS, value)
+    return value
+
+
+def invalidate_stats_cache() -> None:
+    _stats_cache.clear()
 
 
 class Config:
@@ -627,15 +899,92 @@ class Config:
         )
 
 
+def _template_literal(value: str) -> str:
+    """ערך קבוע בתוך תבנית str.format – סוגריים מסולסלים מוכפלים."""
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+_URL_SCHEMES = ("https://", "http://")
+
+
 def safe_get_url(url: str, fallback: str) -> str:
-    return url if url and url.startswith(("http://", "https://")) else fallback
+    return url if url and url.startswith(_URL_SCHEMES) else fallback
+
+
+def _parse_chat_id(raw: str) -> Optional[int]:
+    if not raw:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("Invalid chat id in config: %r", raw)
+        return None
+
+
+# מזהה קבוצת הלוגים מפוענח פעם אחת (None = לא מוגדר / לא תקין)
+LOGS_CHAT_ID: Optional[int] = _parse_chat_id(Config.LOGS_GROUP_CHAT_ID)
+
+# כתובות שנגזרות מ-Config לא משתנות בזמן ריצה – מחושבות פעם אחת
+GROUP_URL = safe_get_url(
+    Config.BUSINESS_GROUP_URL or Config.GROUP_STATIC_INVITE, Config.LANDING_URL
+)
+SUPPORT_URL = safe_get_url(
+    Config.SUPPORT_GROUP_LINK or Config.LANDING_URL, Config.LANDING_URL
+)
+LANDING_PAGE_URL = safe_get_url(Config.LANDING_URL, "https://slh-nft.com")
+LANDING_PAGE_GROUP_URL = safe_get_url(Config.BUSINESS_GROUP_URL, "https://slh-nft.com")
+# בסיס הקישור האישי להזמנת חברים – BOT_USERNAME קבוע, רק ה-user_id משתנה
+REFERRAL_LINK_PREFIX = f"https://t.me/{Config.BOT_USERNAME}?start="
+
+
+_TS_CACHE: List[Any] = [0, ""]
+
+
+def utc_now_iso() -> str:
+    """
+    חותמת זמן UTC בפורמט ISO8601 (ברזולוציית שנייה), לשימוש נקודות ה-API.
+    נשמרת במטמון לשנייה הנוכחית כדי לא לבנות datetime בכל בקשה.
+    """
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE[:] = [now, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))]
+    return _TS_CACHE[1]
+
+
+def json_loads(raw: bytes) -> Any:
+    """פענוח JSON מהיר (orjson אם מותקן, אחרת json מהספרייה הסטנדרטית)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def json_dumps_pretty(data: Any) -> bytes:
+    """סריאליזציה לקבצי ה-JSON המקומיים – UTF-8 עם הזחה של 2, כמו json.dump הקודם."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+# סכום שמשתמש מקליד: ספרות עם נקודה/פסיק עשרוני אופציונלי (בלי NaN/Infinity/אקספוננט).
+# כמו Decimal קודם – מתקבלים גם ".5" ו-"1." (ספרות בצד אחד של הנקודה מספיקות)
+AMOUNT_RE = re.compile(r"\d{1,18}(?:[.,]\d{0,18})?|[.,]\d{1,18}")
+
+
+def parse_amount(raw: str) -> Optional[Decimal]:
+    """
+    מפענח סכום מקלט משתמש; מחזיר None לקלט לא תקין – בלי לבנות Decimal
+    ולתפוס InvalidOperation על כל קלט זבל.
+    """
+    if not AMOUNT_RE.fullmatch(raw):
+        return None
+    return Decimal(raw.replace(",", ".") if "," in raw else raw)
 
 
 def format_decimal_pretty(value: Decimal) -> str:
     try:
         if value == 0:
             return "0"
-        q = value.quantize(Decimal("0.0001"))
+        q = value.quantize(SLH_DISPLAY_QUANTUM)
         s = format(q, "f")
         if "." in s:
             s = s.rstrip("0").rstrip(".")
@@ -644,17 +993,326 @@ def format_decimal_pretty(value: Decimal) -> str:
         return str(value)
 
 
-async def send_log_message(text: str) -> None:
-    """שולח הודעה לקבוצת לוגים (אם מוגדרת)."""
-    if not Config.LOGS_GROUP_CHAT_ID:
+# קריאות DB (psycopg2, חיבור חדש לכל קריאה) רצות ב-thread pool ייעודי: הן לא
+# חוסמות את לולאת האירועים, לא מתחרות ב-threads של קבצים/asyncio.to_thread,
+# ומספר החיבורים המקבילים ל-Postgres חסום ב-DB_MAX_WORKERS
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "8"))
+DB_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=DB_MAX_WORKERS, thread_name_prefix="db"
+)
+
+
+async def run_db(fn: Callable[..., Any], *args: Any) -> Any:
+    """מריץ פונקציית DB סינכרונית ב-DB_EXECUTOR ומחזיר את התוצאה."""
+    return await asyncio.get_running_loop().run_in_executor(DB_EXECUTOR, fn, *args)
+
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if task.cancelled():
         return
-    try:
-        app_instance = TelegramAppManager.get_app()
-        await app_instance.bot.send_message(
-            chat_id=int(Config.LOGS_GROUP_CHAT_ID), text=text
+    exc = task.exception()
+    if exc is not None:
+        logger.error("Background task %s failed: %s", task.get_name(), exc)
+
+
+async def drain_background_tasks(timeout: float) -> None:
+    """
+    מחכה (עד timeout שניות) שמשימות הרקע יסתיימו – כולל משימות שנוצרות בזמן
+    ההמתנה (למשל לוג מינט שנוצר מתוך עיבוד עדכון). נקרא בכיבוי.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while _background_tasks:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        await asyncio.wait(set(_background_tasks), timeout=remaining)
+    if _background_tasks:
+        logger.warning(
+            "Shutdown: %d background tasks still running after %.0fs",
+            len(_background_tasks),
+            timeout,
         )
+
+
+def spawn_background_task(coro: Coroutine[Any, Any, Any], name: str) -> asyncio.Task:
+    """
+    מריץ coroutine ברקע (fire-and-forget) בלי לעכב את ה-handler.
+    שומר הפניה למשימה עד סיומה ומתעד חריגות כדי שלא ייבלעו בלולאת האירועים.
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+
+async def send_user_message(bot: Any, chat_id: int, text: str) -> None:
+    """שולח הודעה למשתמש ומתעד כשל במקום לזרוק – לשימוש בתוך asyncio.gather."""
+    try:
+        await bot.send_message(chat_id=chat_id, text=text)
     except Exception as e:
-        logger.error(f"Failed to send log message: {e}")
+        logger.error("Error sending message to user %s: %s", chat_id, e)
+
+
+class TelegramSendQueue:
+    """
+    תור יציאה להודעות למשתמשים. ה-handlers רק מכניסים לתור וחוזרים מיד;
+    worker יחיד שולח כל הודעה כמשימה נפרדת, כך שבקשה איטית לא עוצרת את
+    ההודעות שאחריה. כש-AIORateLimiter פעיל הוא מגביל את הקצב של כל קריאות
+    ה-Bot API, ולכן ה-token bucket כאן (ברירת מחדל 30 הודעות לשנייה) פועל
+    רק בלעדיו – כדי שלא יהיו שני מגבילי קצב זה על גבי זה.
+    """
+
+    RATE_PER_SECOND: int = int(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+    # בכיבוי – כמה זמן לכל היותר ממשיכים לשלוח את מה שנשאר בתור
+    STOP_FLUSH_SECONDS: float = float(os.getenv("TELEGRAM_SEND_FLUSH_SECONDS", "10"))
+
+    _queue: Optional["asyncio.Queue[tuple]"] = None
+    _worker: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls) -> None:
+        if cls._worker is not None and not cls._worker.done():
+            return
+        cls._queue = asyncio.Queue()
+        cls._worker = asyncio.create_task(cls._run(), name="telegram_send_queue")
+        logger.info("Telegram send queue started")
+
+    @classmethod
+    def put(cls, chat_id: int, text: str) -> None:
+        cls.start()
+        cls._queue.put_nowait((chat_id, text))
+
+    @classmethod
+    async def _run(cls) -> None:
+        loop = asyncio.get_running_loop()
+        throttle = AIORateLimiter is None
+        rate = max(cls.RATE_PER_SECOND, 1)
+        tokens = float(rate)
+        last = loop.time()
+        while True:
+            chat_id, text = await cls._queue.get()
+            if throttle:
+                now = loop.time()
+                tokens = min(float(rate), tokens + (now - last) * rate)
+                last = now
+                if tokens < 1:
+                    await asyncio.sleep((1 - tokens) / rate)
+                    tokens = 1.0
+                    last = loop.time()
+                tokens -= 1
+            try:
+                bot = TelegramAppManager.get_bot()
+            except Exception as e:
+                logger.error("Telegram send queue: no bot instance: %s", e)
+                continue
+            finally:
+                cls._queue.task_done()
+            spawn_background_task(
+                send_user_message(bot, chat_id, text), name=f"send_message:{chat_id}"
+            )
+
+    @classmethod
+    async def stop(cls) -> None:
+        """
+        שולח את מה שנשאר בתור (הודעות אישור/דחייה שהמנהל כבר קיבל עליהן "נשלח"),
+        עד STOP_FLUSH_SECONDS, ורק אז עוצר את ה-worker.
+        """
+        if cls._worker is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + cls.STOP_FLUSH_SECONDS
+        if not cls._worker.done():
+            try:
+                await asyncio.wait_for(cls._queue.join(), cls.STOP_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Telegram send queue: %d messages not sent before shutdown",
+                    cls._queue.qsize(),
+                )
+        cls._worker.cancel()
+        try:
+            await cls._worker
+        except asyncio.CancelledError:
+            pass
+        cls._worker = None
+        # ההודעות שכבר יצאו מהתור נשלחות כמשימות רקע – מחכים גם להן
+        await drain_background_tasks(max(deadline - loop.time(), 0.0))
+
+
+def queue_user_message(chat_id: int, text: str) -> None:
+    """מכניס הודעה למשתמש לתור היציאה המוגבל בקצב (לא ממתין לשליחה)."""
+    TelegramSendQueue.put(chat_id, text)
+
+
+class QueueBatcher:
+    """
+    בסיס משותף ל-batchers: put מכניס פריט לתור וחוזר מיד; worker יחיד אוסף
+    פריטים שמגיעים בחלון של FLUSH_SECONDS (עד MAX_BATCH) ומעביר אותם יחד
+    ל-_flush – המתודה היחידה שתת-מחלקה מממשת.
+    stop מכניס sentinel לסוף התור, כך שה-worker מסיים את ה-batch שבטיפול ואת
+    כל מה שכבר בתור; ביטול בכוח רק אם זה לא הסתיים תוך STOP_TIMEOUT_SECONDS.
+    """
+
+    FLUSH_SECONDS: float = 0.5
+    MAX_BATCH: int = 8
+    STOP_TIMEOUT_SECONDS: float = 10.0
+    # סימן עצירה שנכנס לתור אחרי כל הפריטים שכבר התקבלו
+    _STOP: object = object()
+
+    # התור וה-worker נוצרים לכל תת-מחלקה בנפרד (cls._queue = ... ב-start)
+    _queue: Optional["asyncio.Queue[Any]"] = None
+    _worker: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls) -> None:
+        if cls._worker is not None and not cls._worker.done():
+            return
+        cls._queue = asyncio.Queue()
+        cls._worker = asyncio.create_task(cls._run(), name=cls.__name__)
+
+    @classmethod
+    def _put(cls, item: Any) -> None:
+        cls.start()
+        cls._queue.put_nowait(item)
+
+    @classmethod
+    async def _flush(cls, batch: List[Any]) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    async def _run(cls) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await cls._queue.get()
+            if item is cls._STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + cls.FLUSH_SECONDS
+            while len(batch) < cls.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(cls._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is cls._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await cls._flush(batch)
+            except Exception as e:
+                # batch שנכשל לא עוצר את ה-worker לשאר הפריטים
+                logger.error("%s flush failed: %s", cls.__name__, e)
+            if stopping:
+                return
+
+    @classmethod
+    async def stop(cls) -> None:
+        """עוצר את ה-worker אחרי שסיים את כל מה שכבר נכנס לתור."""
+        if cls._worker is None:
+            return
+        if not cls._worker.done():
+            cls._queue.put_nowait(cls._STOP)
+            done, _ = await asyncio.wait({cls._worker}, timeout=cls.STOP_TIMEOUT_SECONDS)
+            if not done:
+                logger.warning(
+                    "%s: flush not finished after %.0fs, cancelling",
+                    cls.__name__,
+                    cls.STOP_TIMEOUT_SECONDS,
+                )
+                cls._worker.cancel()
+                try:
+                    await cls._worker
+                except asyncio.CancelledError:
+                    pass
+        cls._worker = None
+
+
+class LogMessageBatcher(QueueBatcher):
+    """
+    מאגד הודעות לקבוצת הלוגים: הודעות שמגיעות בחלון של FLUSH_SECONDS
+    נשלחות כהודעת טלגרם אחת (עד 4096 תווים), כדי לא לחרוג ממגבלת
+    ההודעות לקבוצה. על 429 (RetryAfter) ממתינים כפי שטלגרם מבקש ומנסים שוב.
+    """
+
+    FLUSH_SECONDS: float = float(os.getenv("LOG_FLUSH_SECONDS", "2"))
+    MAX_BATCH: int = 20
+    MAX_MESSAGE_LEN: int = 4096
+    MAX_RETRIES: int = 5
+    SEPARATOR: str = "\n---\n"
+
+    @classmethod
+    def put(cls, text: str) -> None:
+        cls._put(text)
+
+    @classmethod
+    def _pack(cls, texts: List[str]) -> List[str]:
+        """מחבר הודעות לחבילות שלא עוברות את מגבלת האורך של טלגרם."""
+        limit = cls.MAX_MESSAGE_LEN
+        sep = cls.SEPARATOR
+        chunks: List[str] = []
+        # החלקים של החבילה הנוכחית + האורך המצטבר שלה; join אחד לכל חבילה
+        # במקום שרשור += חוזר של מחרוזת שהולכת וגדלה.
+        parts: List[str] = []
+        size = 0
+        for text in texts:
+            while len(text) > limit:
+                if parts:
+                    chunks.append(sep.join(parts))
+                    parts, size = [], 0
+                chunks.append(text[:limit])
+                text = text[limit:]
+            if not text:
+                continue
+            if parts and size + len(sep) + len(text) > limit:
+                chunks.append(sep.join(parts))
+                parts, size = [], 0
+            size += len(text) + (len(sep) if parts else 0)
+            parts.append(text)
+        if parts:
+            chunks.append(sep.join(parts))
+        return chunks
+
+    @classmethod
+    async def _send(cls, text: str) -> None:
+        for _ in range(cls.MAX_RETRIES):
+            try:
+                await TelegramAppManager.get_bot().send_message(
+                    chat_id=LOGS_CHAT_ID, text=text
+                )
+                return
+            except RetryAfter as e:
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                await asyncio.sleep(delay * random.uniform(1.0, 1.5))
+            except Exception as e:
+                logger.error("Failed to send log message: %s", e)
+                return
+        logger.error("Failed to send log message: rate limited %s times", cls.MAX_RETRIES)
+
+    @classmethod
+    async def _flush(cls, batch: List[str]) -> None:
+        for chunk in cls._pack(batch):
+            await cls._send(chunk)
+
+
+async def send_log_message(text: str) -> None:
+    """
+    שולח הודעה לקבוצת לוגים (אם מוגדרת).
+    ההודעה נכנסת לתור ונשלחת מאוגדת עם הודעות סמוכות (LogMessageBatcher).
+    """
+    if LOGS_CHAT_ID is None:
+        return
+    LogMessageBatcher.put(text)
 
 
 async def send_bug_report(
@@ -666,26 +1324,45 @@ async def send_bug_report(
     שליחת דיווח באג לקבוצת הלוגים.
     feature_id – מזהה קצר של המסך / כפתור.
     """
-    if not Config.LOGS_GROUP_CHAT_ID:
+    if LOGS_CHAT_ID is None:
         return
     try:
-        lines = [
-            "🐞 דיווח תקלה חדש מהבוט:",
-            f"📍 פיצ'ר: {feature_id}",
-        ]
-        if user is not None:
-            lines.append(f"👤 user_id={user.id}, username=@{user.username or 'N/A'}")
-            lines.append(f"👤 full_name={user.full_name}")
-        if chat is not None:
-            lines.append(f"💬 chat_id={chat.id}, type={chat.type}")
-        await send_log_message("\n".join(lines))
+        user_lines = (
+            f"\n👤 user_id={user.id}, username=@{user.username or 'N/A'}"
+            f"\n👤 full_name={user.full_name}"
+            if user is not None
+            else ""
+        )
+        chat_line = (
+            f"\n💬 chat_id={chat.id}, type={chat.type}" if chat is not None else ""
+        )
+        await send_log_message(
+            "🐞 דיווח תקלה חדש מהבוט:\n"
+            f"📍 פיצ'ר: {feature_id}"
+            f"{user_lines}{chat_line}"
+        )
     except Exception as e:
-        logger.error(f"Failed to send bug report: {e}")
+        logger.error("Failed to send bug report: %s", e)
 
 
 # =========================
 # Telegram application manager
 # =========================
+# הגדרות setWebhook: עד 100 חיבורי HTTPS מקבילים מטלגרם (המקסימום של ה-API),
+# רק סוגי העדכונים שה-handlers מטפלים בהם, וסוד שטלגרם מצרף לכל בקשה
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_ALLOWED_UPDATES = ["message", "edited_message", "callback_query"]
+WEBHOOK_SECRET_TOKEN: Optional[str] = os.getenv("TG_WEBHOOK_SECRET") or None
+
+# ברירת המחדל זהה לזו של ApplicationBuilder ב-PTB 22 (256) – ניתן לשינוי דרך env
+TELEGRAM_CONNECTION_POOL_SIZE = int(os.getenv("TELEGRAM_CONNECTION_POOL_SIZE", "256"))
+# HTTP/2 (מולטיפלקס על חיבור אחד) רק כשחבילת h2 מותקנת – אחרת httpx נכשל
+TELEGRAM_HTTP_VERSION = "2" if h2 is not None else "1.1"
+
+TELEGRAM_OVERALL_MAX_RATE = int(os.getenv("TELEGRAM_OVERALL_MAX_RATE", "25"))
+TELEGRAM_GROUP_MAX_RATE = int(os.getenv("TELEGRAM_GROUP_MAX_RATE", "18"))
+
+
 class TelegramAppManager:
     """
     מנהל את אובייקט Application של python-telegram-bot.
@@ -693,6 +1370,7 @@ class TelegramAppManager:
     """
 
     _instance: Optional[Application] = None
+    _bot: Optional[Any] = None
     _initialized: bool = False
     _started: bool = False
 
@@ -701,54 +1379,45 @@ class TelegramAppManager:
         if cls._instance is None:
             if not Config.BOT_TOKEN:
                 raise RuntimeError("BOT_TOKEN is not set")
-            cls._instance = Application.builder().token(Config.BOT_TOKEN).build()
+            # מאגר חיבורים גדול ל-Bot API (keep-alive), כך שפרצי שליחה – אישורים,
+            # fan-out, קבוצת הלוגים – לא ממתינים לחיבור פנוי או ללחיצת TLS חדשה
+            builder = (
+                Application.builder()
+                .token(Config.BOT_TOKEN)
+                .connection_pool_size(TELEGRAM_CONNECTION_POOL_SIZE)
+                .pool_timeout(5.0)
+                .read_timeout(20.0)
+                .write_timeout(20.0)
+                .http_version(TELEGRAM_HTTP_VERSION)
+            )
+            if AIORateLimiter is not None:
+                # מגבלת קצב גלובלית לכל קריאות ה-Bot API (כולל תשובות ישירות
+                # מה-handlers), מתחת למגבלות של טלגרם: ~30/שנייה, ~20/דקה לקבוצה
+                builder = builder.rate_limiter(
+                    AIORateLimiter(
+                        overall_max_rate=TELEGRAM_OVERALL_MAX_RATE,
+                        overall_time_period=1,
+                        group_max_rate=TELEGRAM_GROUP_MAX_RATE,
+                        group_time_period=60,
+                    )
+                )
+            cls._instance = builder.build()
             logger.info("Telegram Application instance created")
         return cls._instance
 
+    @classmethod
+    def get_bot(cls) -> Any:
+        """מחזיר את אובייקט ה-Bot (נשמר אחרי הקריאה הראשונה)."""
+        if cls._bot is None:
+            cls._bot = cls.get_app().bot
+        return cls._bot
+
     @classmethod
     def initialize_handlers(cls) -> None:
         if cls._initialized:
             return
 
-        app_instance = cls.get_app()
-
-        handlers = [
-            CommandHandler("start", start_command),
-            CommandHandler("whoami", whoami_command),
-            CommandHandler("stats", stats_command),
-            CommandHandler("help", help_command),
-
-            # אדמין – בסיס + מתקדם
-            CommandHandler("admin", admin_command),
-            CommandHandler("pending", pending_command),
-            CommandHandler("approve", approve_command),
-            CommandHandler("reject", reject_command),
-            CommandHandler("set_price", set_price_command),
-            CommandHandler("admin_wallet", admin_wallet_command),
-            CommandHandler("admin_user", admin_user_command),
-            CommandHandler("admin_credit", admin_credit_command),
-
-            # ארנק & סטייקינג & הפניות
-            CommandHandler("wallet", wallet_command),
-            CommandHandler("send_slh", send_slh_command),
-            CommandHandler("stake", stake_command),
-            CommandHandler("mystakes", mystakes_command),
-            CommandHandler("my_link", my_link_command),
-            CommandHandler("my_referrals", my_referrals_command),
-            CommandHandler("portfolio", portfolio_command),
-
-            # ארנק חיצוני אישי (בדיקות בלבד)
-            CommandHandler("onchain_wallet", onchain_wallet_command),
-            CommandHandler("set_wallet", set_wallet_command),
-
-            CallbackQueryHandler(callback_query_handler),
-            MessageHandler(filters.PHOTO | filters.Document.ALL, payment_proof_handler),
-            MessageHandler(filters.TEXT & ~filters.COMMAND, echo_message),
-            MessageHandler(filters.COMMAND, unknown_command),
-        ]
-
-        for h in handlers:
-            app_instance.add_handler(h)
+        cls.get_app().add_handlers(TELEGRAM_HANDLERS)
 
         cls._initialized = True
         logger.info("Telegram handlers initialized")
@@ -762,7 +1431,12 @@ class TelegramAppManager:
             await app_instance.start()
             try:
                 if Config.WEBHOOK_URL:
-                    await app_instance.bot.set_webhook(Config.WEBHOOK_URL)
+                    await app_instance.bot.set_webhook(
+                        Config.WEBHOOK_URL,
+                        max_connections=WEBHOOK_MAX_CONNECTIONS,
+                        allowed_updates=WEBHOOK_ALLOWED_UPDATES,
+                        secret_token=WEBHOOK_SECRET_TOKEN,
+                    )
                     logger.info(f"Webhook set to {Config.WEBHOOK_URL}")
             except Exception as e:
                 logger.error(f"Failed to set webhook: {e}")
@@ -782,9 +1456,49 @@ class TelegramAppManager:
 # =========================
 # UI builders
 # =========================
-def build_start_keyboard(has_paid: bool) -> InlineKeyboardMarkup:
-    """
-    תפריט התחלה:
+# כפתורים קבועים – התוכן שלהם תלוי רק בקבועים, לכן נבנים פעם אחת ומשותפים לכל המקלדות
+BTN_BENEFITS = InlineKeyboardButton("ℹ️ מה אני מקבל?", callback_data="info_benefits")
+BTN_PAYMENT_MENU = InlineKeyboardButton(
+    "💳 איך לשלם ולשלוח אישור", callback_data="send_proof_menu"
+)
+BTN_GROUP = InlineKeyboardButton("👥 כניסה לקבוצת העסקים", url=GROUP_URL)
+BTN_INVESTOR = InlineKeyboardButton("📈 מידע למשקיעים", callback_data="open_investor")
+BTN_PERSONAL_AREA = InlineKeyboardButton(
+    "👤 האזור האישי שלי", callback_data="open_personal_area"
+)
+BTN_SUPPORT = InlineKeyboardButton("🆘 תמיכה / צור קשר", url=SUPPORT_URL)
+BTN_BUG_START_MENU = InlineKeyboardButton(
+    "🐞 דיווח על תקלה / באג", callback_data="report_bug:start_menu"
+)
+BTN_BACK_TO_MAIN = InlineKeyboardButton(
+    "🔙 חזרה לתפריט הראשי", callback_data="back_to_main"
+)
+BTN_HOME = InlineKeyboardButton("🏠 חזרה לתפריט הראשי", callback_data="back_to_main")
+BTN_SEND_PROOF_NOW = InlineKeyboardButton(
+    "📤 שלח עכשיו צילום מסך", callback_data="send_proof_menu"
+)
+BTN_BACK_TO_PAYMENTS = InlineKeyboardButton(
+    "🔙 חזרה לאפשרויות תשלום", callback_data="send_proof_menu"
+)
+BTN_PAY_BANK = InlineKeyboardButton("🏦 העברה בנקאית", callback_data="pay_bank")
+
+
+# שורות תפריט ההתחלה לפי הסדר: (שורה, מוצג רק למי ששילם?)
+START_ROW_SPECS = (
+    ((BTN_BENEFITS,), False),
+    ((BTN_PAYMENT_MENU,), False),
+    ((BTN_GROUP,), True),
+    ((BTN_INVESTOR,), False),
+    ((BTN_PERSONAL_AREA,), False),
+    ((BTN_SUPPORT,), False),
+    # כפתור דיווח באג גלובלי – feature_id=start_menu
+    ((BTN_BUG_START_MENU,), False),
+)
+
+
+def build_start_keyboard(has_paid: bool) -> InlineKeyboardMarkup:
+    """
+    תפריט התחלה:
     1. מה אני מקבל?
     2. איך לשלם ולשלוח אישור (תפריט אמצעי תשלום)
     3. כניסה לקבוצת העסקים (אם אושר)
@@ -793,61 +1507,24 @@ def build_start_keyboard(has_paid: bool) -> InlineKeyboardMarkup:
     6. תמיכה
     7. דיווח באג
     """
-    buttons: List[List[InlineKeyboardButton]] = []
-
-    buttons.append(
-        [InlineKeyboardButton("ℹ️ מה אני מקבל?", callback_data="info_benefits")]
-    )
-
-    buttons.append(
-        [
-            InlineKeyboardButton(
-                "💳 איך לשלם ולשלוח אישור", callback_data="send_proof_menu"
-            )
-        ]
+    return InlineKeyboardMarkup(
+        [row for row, paid_only in START_ROW_SPECS if has_paid or not paid_only]
     )
 
-    group_url = safe_get_url(
-        Config.BUSINESS_GROUP_URL or Config.GROUP_STATIC_INVITE, Config.LANDING_URL
-    )
-    if has_paid:
-        buttons.append(
-            [InlineKeyboardButton("👥 כניסה לקבוצת העסקים", url=group_url)]
-        )
-
-    buttons.append(
-        [
-            InlineKeyboardButton(
-                "📈 מידע למשקיעים", callback_data="open_investor"
-            )
-        ]
-    )
-
-    buttons.append(
-        [
-            InlineKeyboardButton(
-                "👤 האזור האישי שלי", callback_data="open_personal_area"
-            )
-        ]
-    )
 
-    support_url = safe_get_url(
-        Config.SUPPORT_GROUP_LINK or Config.LANDING_URL, Config.LANDING_URL
-    )
-    buttons.append(
-        [InlineKeyboardButton("🆘 תמיכה / צור קשר", url=support_url)]
-    )
+# המקלדת תלויה רק ב-has_paid (וב-Config הקבוע) – שתי הגרסאות נבנות מראש
+START_KEYBOARDS: Dict[bool, InlineKeyboardMarkup] = {
+    has_paid: build_start_keyboard(has_paid) for has_paid in (False, True)
+}
 
-    # כפתור דיווח באג גלובלי – feature_id=start_menu
-    buttons.append(
-        [
-            InlineKeyboardButton(
-                "🐞 דיווח על תקלה / באג", callback_data="report_bug:start_menu"
-            )
-        ]
-    )
 
-    return InlineKeyboardMarkup(buttons)
+# אמצעי תשלום אופציונליים: (מוגדר?, תווית, callback_data)
+OPTIONAL_PAYMENT_BUTTONS = (
+    (Config.PAYBOX_URL, "📲 תשלום PayBox", "pay_paybox"),
+    (Config.BIT_URL, "📲 תשלום Bit", "pay_bit"),
+    (Config.PAYPAL_URL, "🌍 תשלום PayPal", "pay_paypal"),
+    (Config.TON_WALLET_ADDRESS, "🔐 תשלום בקריפטו (TON)", "pay_ton"),
+)
 
 
 def build_payment_menu_keyboard() -> InlineKeyboardMarkup:
@@ -855,37 +1532,107 @@ def build_payment_menu_keyboard() -> InlineKeyboardMarkup:
     תפריט לכל אמצעי התשלום. כל כפתור פותח הסבר מפורט
     איך לשלם ואיך לשלוח אישור.
     """
-    rows: List[List[InlineKeyboardButton]] = []
-
-    rows.append([InlineKeyboardButton("🏦 העברה בנקאית", callback_data="pay_bank")])
-
-    if Config.PAYBOX_URL:
-        rows.append(
-            [InlineKeyboardButton("📲 תשלום PayBox", callback_data="pay_paybox")]
-        )
-    if Config.BIT_URL:
-        rows.append(
-            [InlineKeyboardButton("📲 תשלום Bit", callback_data="pay_bit")]
-        )
-    if Config.PAYPAL_URL:
-        rows.append(
-            [InlineKeyboardButton("🌍 תשלום PayPal", callback_data="pay_paypal")]
-        )
-    if Config.TON_WALLET_ADDRESS:
-        rows.append(
-            [InlineKeyboardButton("🔐 תשלום בקריפטו (TON)", callback_data="pay_ton")]
+    return InlineKeyboardMarkup(
+        (
+            (BTN_PAY_BANK,),
+            *(
+                (InlineKeyboardButton(label, callback_data=callback_data),)
+                for configured, label, callback_data in OPTIONAL_PAYMENT_BUTTONS
+                if configured
+            ),
+            (BTN_BACK_TO_MAIN,),
         )
-
-    rows.append(
-        [InlineKeyboardButton("🔙 חזרה לתפריט הראשי", callback_data="back_to_main")]
     )
 
-    return InlineKeyboardMarkup(rows)
+
+# תפריט התשלום תלוי רק ב-Config – נבנה פעם אחת
+PAYMENT_MENU_KEYBOARD = build_payment_menu_keyboard()
 
 
 # =========================
 # Telegram handlers
 # =========================
+# file_id של תמונת הפתיחה – אחרי ההעלאה הראשונה שולחים לפיו בלי להעלות שוב את הקובץ.
+# נשמר לדיסק כדי לשרוד restart, ומתבטל אם ה-mtime של התמונה השתנה.
+START_PHOTO_CACHE_FILE = DATA_DIR / "start_photo.json"
+_start_photo_cache: Optional[Dict[str, Any]] = None
+
+
+def _load_start_photo_cache() -> Dict[str, Any]:
+    global _start_photo_cache
+    if _start_photo_cache is None:
+        try:
+            _start_photo_cache = json_loads(START_PHOTO_CACHE_FILE.read_bytes())
+        except FileNotFoundError:
+            _start_photo_cache = {}
+        except Exception as e:
+            logger.error("Error loading start photo cache: %s", e)
+            _start_photo_cache = {}
+    return _start_photo_cache
+
+
+def _save_start_photo_cache(mtime: int, file_id: str) -> None:
+    global _start_photo_cache
+    _start_photo_cache = {"mtime": mtime, "file_id": file_id}
+    try:
+        tmp_path = START_PHOTO_CACHE_FILE.with_suffix(".tmp")
+        tmp_path.write_bytes(json_dumps_pretty(_start_photo_cache))
+        tmp_path.replace(START_PHOTO_CACHE_FILE)
+    except Exception as e:
+        logger.error("Error saving start photo cache: %s", e)
+
+
+# תוכן קובץ התמונה בזיכרון (לפי mtime) – להעלאות חוזרות בלי לקרוא מהדיסק
+_START_IMAGE_CACHE: Dict[str, Any] = {"mtime": None, "data": None}
+
+
+def _start_image_bytes(image_path: Path, mtime: int) -> bytes:
+    if _START_IMAGE_CACHE["mtime"] != mtime:
+        _START_IMAGE_CACHE["data"] = image_path.read_bytes()
+        _START_IMAGE_CACHE["mtime"] = mtime
+    return _START_IMAGE_CACHE["data"]
+
+
+def preload_start_banner() -> None:
+    """
+    נקרא בעליית השרת: טוען מראש את ה-file_id השמור ואת קובץ התמונה לזיכרון,
+    כך שה-/start הראשון לא קורא מהדיסק בתוך לולאת האירועים.
+    """
+    _load_start_photo_cache()
+    image_path = BASE_DIR / Config.START_IMAGE_PATH
+    try:
+        _start_image_bytes(image_path, image_path.stat().st_mtime_ns)
+    except OSError as e:
+        logger.warning("Start banner not preloaded (%s): %s", image_path, e)
+
+
+async def send_start_banner(chat: Chat, title: str) -> None:
+    """
+    שולח את תמונת הפתיחה (או רק את הכותרת אם אין תמונה).
+    משתמש ב-file_id השמור כשהוא תקף, ומעלה את הקובץ רק בפעם הראשונה / אחרי שינוי.
+    """
+    image_path = BASE_DIR / Config.START_IMAGE_PATH
+    try:
+        mtime = image_path.stat().st_mtime_ns
+    except OSError:
+        await chat.send_message(text=title)
+        return
+
+    cache = _load_start_photo_cache()
+    if cache.get("file_id") and cache.get("mtime") == mtime:
+        try:
+            await chat.send_photo(photo=cache["file_id"], caption=title)
+            return
+        except Exception as e:
+            # file_id לא תקף (למשל טוקן אחר) – מעלים מחדש
+            logger.warning("Cached start photo file_id rejected: %s", e)
+
+    photo = InputFile(_start_image_bytes(image_path, mtime), filename=image_path.name)
+    msg = await chat.send_photo(photo=photo, caption=title)
+    if msg.photo:
+        _save_start_photo_cache(mtime, msg.photo[-1].file_id)
+
+
 async def send_start_screen(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
@@ -900,9 +1647,11 @@ async def send_start_screen(
     if not user or not chat:
         return
 
-    # register referral & update profile snapshot
-    register_referral(user.id, referrer)
-    upsert_profile(user.id, user.username, user.full_name)
+    # register referral & update profile snapshot – הכתיבות לדיסק רצות מחוץ ללולאה
+    await asyncio.gather(
+        register_referral_async(user.id, referrer),
+        asyncio.to_thread(upsert_profile, user.id, user.username, user.full_name),
+    )
 
     # load title & body
     title = load_message_block("START_TITLE", "🚀 ברוך הבא ל-SLHNET!")
@@ -916,13 +1665,8 @@ async def send_start_screen(
     )
 
     # send banner
-    image_path = BASE_DIR / Config.START_IMAGE_PATH
     try:
-        if image_path.exists() and image_path.is_file():
-            with image_path.open("rb") as f:
-                await chat.send_photo(photo=InputFile(f), caption=title)
-        else:
-            await chat.send_message(text=title)
+        await send_start_banner(chat, title)
     except Exception as e:
         logger.error(f"Error sending start image: {e}")
         await chat.send_message(text=title)
@@ -930,12 +1674,11 @@ async def send_start_screen(
     # check if paid
     has_paid = False
     try:
-        has_paid = has_approved_payment(user.id)
+        has_paid = await has_approved_payment_cached(user.id)
     except Exception as e:
         logger.error(f"Error checking approved payment for user {user.id}: {e}")
 
-    keyboard = build_start_keyboard(has_paid)
-    await chat.send_message(text=body, reply_markup=keyboard)
+    await chat.send_message(text=body, reply_markup=START_KEYBOARDS[has_paid])
 
     # log
     log_text = (
@@ -964,7 +1707,7 @@ async def whoami_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not user or not chat:
         return
 
-    refs = load_referrals()
+    refs = await load_referrals_async()
     ref_data = refs.get("users", {}).get(str(user.id), {})
     text = (
         "👤 **פרטי המשתמש שלך:**\n"
@@ -983,13 +1726,11 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not user or not chat:
         return
 
-    refs = load_referrals()
+    refs = await load_referrals_async()
     stats = refs.get("statistics", {})
     total_users = stats.get("total_users", 0)
     users_count = len(refs.get("users", {}))
-    total_refs = sum(
-        u.get("referral_count", 0) for u in refs.get("users", {}).values()
-    )
+    total_refs = stats.get("total_referrals", 0)
 
     text = (
         "📊 סטטיסטיקות קהילה:\n"
@@ -1000,6 +1741,29 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await chat.send_message(text=text)
 
 
+HELP_TEXT = (
+    "🤖 *עזרה – SLHNET Bot*\n\n"
+    "פקודות בסיסיות:\n"
+    "• /start – תפריט ראשי והצטרפות\n"
+    "• /my_link – קישור אישי להזמנת חברים\n"
+    "• /my_referrals – רשימת הפניות שלך\n"
+    "• /portfolio – סקירה של הארנק, סטייקינג והפניות\n"
+    "• /wallet – פירוט ארנק SLH פנימי + חיצוני (בדיקות)\n"
+    "• /mystakes – פירוט עמדות סטייקינג\n"
+    "• /onchain_wallet – צפייה בארנק החיצוני (BSC/TON)\n"
+    "• /set_wallet – הגדרת ארנק חיצוני (בדיקות בלבד)\n\n"
+    "פקודות למנהלים בלבד:\n"
+    "• /admin – פאנל ניהול\n"
+    "• /pending – תשלומים ממתינים\n"
+    "• /approve <user_id> – אישור תשלום + מינט SLH פנימי\n"
+    "• /reject <user_id> <סיבה> – דחיית תשלום\n"
+    "• /set_price <מחיר_ש\"ח_ל-SLH_1> – עדכון שער SLH\n"
+    "• /admin_wallet – סקירת ארנק מערכת ושערים\n"
+    "• /admin_user <user_id> – צילום מצב משתמש\n"
+    "• /admin_credit <user_id> <amount_slh> – קרדיט ידני של SLH\n"
+)
+
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     פקודת עזרה ידידותית למשתמשים.
@@ -1008,151 +1772,254 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     if not chat:
         return
 
-    text = (
-        "🤖 *עזרה – SLHNET Bot*\n\n"
-        "פקודות בסיסיות:\n"
-        "• /start – תפריט ראשי והצטרפות\n"
-        "• /my_link – קישור אישי להזמנת חברים\n"
-        "• /my_referrals – רשימת הפניות שלך\n"
-        "• /portfolio – סקירה של הארנק, סטייקינג והפניות\n"
-        "• /wallet – פירוט ארנק SLH פנימי + חיצוני (בדיקות)\n"
-        "• /mystakes – פירוט עמדות סטייקינג\n"
-        "• /onchain_wallet – צפייה בארנק החיצוני (BSC/TON)\n"
-        "• /set_wallet – הגדרת ארנק חיצוני (בדיקות בלבד)\n\n"
-        "פקודות למנהלים בלבד:\n"
-        "• /admin – פאנל ניהול\n"
-        "• /pending – תשלומים ממתינים\n"
-        "• /approve <user_id> – אישור תשלום + מינט SLH פנימי\n"
-        "• /reject <user_id> <סיבה> – דחיית תשלום\n"
-        "• /set_price <מחיר_ש\"ח_ל-SLH_1> – עדכון שער SLH\n"
-        "• /admin_wallet – סקירת ארנק מערכת ושערים\n"
-        "• /admin_user <user_id> – צילום מצב משתמש\n"
-        "• /admin_credit <user_id> <amount_slh> – קרדיט ידני של SLH\n"
-    )
-    await chat.send_message(text=text)
+    await chat.send_message(text=HELP_TEXT)
 
 
 # ===== Payments & admin =====
-async def payment_proof_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """
-    קבלת צילום/קובץ כאישור תשלום והעברת הלוג לקבוצת הניהול.
-    """
-    user = update.effective_user
-    chat = update.effective_chat
-    message = update.message
+# מילות מפתח לזיהוי אמצעי התשלום מהכיתוב – מעבר אחד על הטקסט.
+# bit/ton באנגלית רק כמילה שלמה (כדי ש-"arbitrary"/"button" לא ייחשבו).
+PAYMENT_METHOD_RE = re.compile(
+    r"(?P<paybox>paybox|פייבוקס)|(?P<paypal>paypal|פייפאל)|(?P<bit>\bbit\b|ביט)"
+    r"|(?P<bank>bank|בנק|העברה)|(?P<ton>\bton\b)",
+    re.IGNORECASE,
+)
+# סדר העדיפויות כשמופיעות כמה מילות מפתח: (שם הקבוצה, pay_method)
+PAYMENT_METHOD_PRIORITY = (
+    ("paybox", "paybox"),
+    ("paypal", "paypal"),
+    ("bit", "bit"),
+    ("bank", "bank-transfer"),
+    ("ton", "ton"),
+)
 
-    if not user or not chat or not message:
-        return
 
-    if chat.type != "private":
-        return
+def detect_payment_method(caption: str) -> str:
+    found = {m.lastgroup for m in PAYMENT_METHOD_RE.finditer(caption)}
+    for group, pay_method in PAYMENT_METHOD_PRIORITY:
+        if group in found:
+            return pay_method
+    return "screenshot"
+
+
+# פרטי אישור תשלום בודד לקבוצת הניהול
+PAYMENT_PROOF_ADMIN_TEMPLATE = (
+    "📥 התקבל אישור תשלום חדש.\n\n"
+    "user_id = {user_id}\n"
+    "username = @{username}\n"
+    "from chat_id = {from_chat_id}\n"
+    "שיטת תשלום: {pay_method}\n\n"
+    "לאישור (עבור אדמין ראשי):\n"
+    "/approve {user_id}\n"
+    "/reject {user_id} <סיבה>\n"
+    "(או להשתמש בכפתורי האישור/דחייה מתחת להודעה זו)"
+)
 
-    caption = message.caption or ""
-    text_lower = caption.lower()
 
-    if "paybox" in text_lower or "פייבוקס" in text_lower:
-        pay_method = "paybox"
-    elif "paypal" in text_lower or "פייפאל" in text_lower:
-        pay_method = "paypal"
-    elif "bit" in text_lower or "ביט" in text_lower:
-        pay_method = "bit"
-    elif "bank" in text_lower or "בנק" in text_lower or "העברה" in text_lower:
-        pay_method = "bank-transfer"
-    elif "ton" in text_lower:
-        pay_method = "ton"
-    else:
-        pay_method = "screenshot"
+class PaymentProofBatcher(QueueBatcher):
+    """
+    מעביר אישורי תשלום לקבוצת הניהול. אישור בודד מועתק עם הפרטים והכפתורים
+    ככיתוב – קריאת API אחת. אישורים שמגיעים בחלון של FLUSH_SECONDS (עד
+    MAX_BATCH) מועתקים לפי הסדר ומקבלים הודעת סיכום אחת עם שורת כפתורים לכל משתמש.
+    """
 
-    try:
-        log_payment(user.id, user.username, pay_method)
-    except Exception as e:
-        logger.error(f"Error logging payment for user {user.id}: {e}")
+    FLUSH_SECONDS: float = float(os.getenv("PAYMENT_PROOF_FLUSH_SECONDS", "0.5"))
+    MAX_BATCH: int = 8
+    # מגבלת הכיתוב של טלגרם למדיה
+    CAPTION_LIMIT: int = 1024
 
-    if Config.LOGS_GROUP_CHAT_ID:
-        try:
-            admin_chat_id = int(Config.LOGS_GROUP_CHAT_ID)
-            await context.bot.copy_message(
-                chat_id=admin_chat_id,
-                from_chat_id=chat.id,
-                message_id=message.message_id,
+    @classmethod
+    def put(
+        cls,
+        user_id: int,
+        username: Optional[str],
+        from_chat_id: int,
+        message_id: int,
+        pay_method: str,
+        caption: Optional[str] = None,
+    ) -> None:
+        # (user_id, username, from_chat_id, message_id, pay_method, caption)
+        cls._put((user_id, username, from_chat_id, message_id, pay_method, caption))
+
+    @staticmethod
+    def _build_digest(batch: List[tuple]) -> tuple:
+        """טקסט + מקלדת להודעת הסיכום (אישור בודד נשאר בפורמט המקורי)."""
+        if len(batch) == 1:
+            user_id, username, from_chat_id, _, pay_method, _ = batch[0]
+            text = PAYMENT_PROOF_ADMIN_TEMPLATE.format(
+                user_id=user_id,
+                username=username or "לא ידוע",
+                from_chat_id=from_chat_id,
+                pay_method=pay_method,
             )
-
-            keyboard = InlineKeyboardMarkup(
+            rows = [
                 [
-                    [
-                        InlineKeyboardButton(
-                            "✅ אישור תשלום", callback_data=f"approve:{user.id}"
-                        ),
-                        InlineKeyboardButton(
-                            "❌ דחיית תשלום", callback_data=f"reject:{user.id}"
-                        ),
-                    ]
+                    InlineKeyboardButton(
+                        "✅ אישור תשלום", callback_data=f"approve:{user_id}"
+                    ),
+                    InlineKeyboardButton(
+                        "❌ דחיית תשלום", callback_data=f"reject:{user_id}"
+                    ),
                 ]
-            )
+            ]
+            return text, InlineKeyboardMarkup(rows)
 
-            admin_text = (
-                "📥 התקבל אישור תשלום חדש.\n\n"
-                f"user_id = {user.id}\n"
-                f"username = @{user.username or 'לא ידוע'}\n"
-                f"from chat_id = {chat.id}\n"
-                f"שיטת תשלום: {pay_method}\n\n"
-                "לאישור (עבור אדמין ראשי):\n"
-                f"/approve {user.id}\n"
-                f"/reject {user.id} <סיבה>\n"
-                "(או להשתמש בכפתורי האישור/דחייה מתחת להודעה זו)"
-            )
+        lines = "\n".join(
+            f"• user_id = {user_id} | @{username or 'לא ידוע'} | {pay_method}"
+            for user_id, username, _, _, pay_method, _ in batch
+        )
+        text = (
+            f"📥 התקבלו {len(batch)} אישורי תשלום חדשים (ההודעות המקוריות למעלה).\n\n"
+            f"{lines}\n\n"
+            "לאישור (עבור אדמין ראשי):\n"
+            "/approve <user_id>\n"
+            "/reject <user_id> <סיבה>\n"
+            "(או להשתמש בכפתורים – שורה לכל משתמש)"
+        )
+        rows = [
+            [
+                InlineKeyboardButton(
+                    f"✅ אישור {user_id}", callback_data=f"approve:{user_id}"
+                ),
+                InlineKeyboardButton(
+                    f"❌ דחייה {user_id}", callback_data=f"reject:{user_id}"
+                ),
+            ]
+            for user_id, _, _, _, _, _ in batch
+        ]
+        return text, InlineKeyboardMarkup(rows)
 
-            await context.bot.send_message(
-                chat_id=admin_chat_id,
-                text=admin_text,
-                reply_markup=keyboard,
+    @classmethod
+    async def _flush(cls, batch: List[tuple]) -> None:
+        try:
+            bot = TelegramAppManager.get_bot()
+        except Exception as e:
+            logger.error("Error sending payment log to admin group: %s", e)
+            return
+        text, keyboard = cls._build_digest(batch)
+
+        if len(batch) == 1:
+            # העתק אחד שנושא גם את הפרטים וגם את כפתורי האישור/דחייה
+            _, _, from_chat_id, message_id, _, caption = batch[0]
+            if caption:
+                text = f"{text}\n\n📝 כיתוב מקורי: {caption}"
+            try:
+                await bot.copy_message(
+                    chat_id=LOGS_CHAT_ID,
+                    from_chat_id=from_chat_id,
+                    message_id=message_id,
+                    caption=text[: cls.CAPTION_LIMIT],
+                    reply_markup=keyboard,
+                )
+            except Exception as e:
+                logger.error("Error sending payment log to admin group: %s", e)
+            return
+
+        # ההעתקים נשלחים אחד אחרי השני – כך שהם מופיעים בקבוצה בסדר של רשימת
+        # הסיכום. כשל בהעתק אחד (הודעה שנמחקה, RetryAfter) לא מונע את הסיכום,
+        # שנושא את כפתורי האישור/דחייה של כל המשתמשים ב-batch.
+        for user_id, _, from_chat_id, message_id, _, _ in batch:
+            try:
+                await bot.copy_message(
+                    chat_id=LOGS_CHAT_ID,
+                    from_chat_id=from_chat_id,
+                    message_id=message_id,
+                )
+            except Exception as e:
+                logger.error("Error copying payment proof of %s: %s", user_id, e)
+        try:
+            await bot.send_message(
+                chat_id=LOGS_CHAT_ID, text=text, reply_markup=keyboard
             )
         except Exception as e:
-            logger.error(f"Error sending payment log to admin group: {e}")
+            logger.error("Error sending payment digest to admin group: %s", e)
 
-    await chat.send_message(
-        "📥 קיבלנו את אישור התשלום שלך!\n"
-        "ההודעה הועברה לצוות הניהול. לאחר אישור, ישלח אליך קישור לקבוצת העסקים + זיכוי SLH בארנק הפנימי."
-    )
 
+class PaymentStatusBatcher(QueueBatcher):
+    """
+    מאחד עדכוני סטטוס תשלום (אישור/דחייה) שמגיעים בחלון קצר של FLUSH_SECONDS
+    ל-UPDATE אחד ב-DB – כשמנהל עובר ברצף על /pending כל לחיצה לא פותחת חיבור משלה.
+    submit מחזיר Future שמסתיים כשה-batch נכתב (או נכשל).
+    """
 
-async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    FLUSH_SECONDS: float = float(os.getenv("PAYMENT_STATUS_FLUSH_SECONDS", "0.03"))
+    MAX_BATCH: int = 64
+
+    @classmethod
+    def submit(
+        cls, user_id: int, status: str, reason: Optional[str]
+    ) -> "asyncio.Future[None]":
+        future = asyncio.get_running_loop().create_future()
+        cls._put((user_id, status, reason, future))
+        return future
+
+    @classmethod
+    async def _flush(cls, batch: List[tuple]) -> None:
+        # עדכון אחרון לכל משתמש גובר – כמו הרצה סדרתית של העדכונים
+        latest = {user_id: (user_id, status, reason) for user_id, status, reason, _ in batch}
+        try:
+            await run_db(update_payment_statuses, list(latest.values()))
+        except asyncio.CancelledError:
+            # רק כשה-stop נכשל לסיים בזמן – שהקוראים לא ימתינו לנצח
+            for *_, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for *_, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+
+async def payment_proof_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    פאנל ניהול בסיסי + מתקדם למנהלים בלבד.
+    קבלת צילום/קובץ כאישור תשלום והעברת הלוג לקבוצת הניהול.
     """
     user = update.effective_user
     chat = update.effective_chat
-    if not user or not chat:
+    message = update.message
+
+    if not user or not chat or not message:
         return
 
-    if not is_admin(user.id):
-        await chat.send_message("❌ הפקודה /admin מיועדת למנהלי המערכת בלבד.")
+    if chat.type != "private":
         return
 
-    approval_stats = get_approval_stats() or {}
-    reserve_stats = get_reserve_stats() or {}
-    price_nis, entry_nis = get_current_price_and_entry()
-    cfg = load_dynamic_config()
+    pay_method = detect_payment_method(message.caption or "")
 
-    text_lines = [
-        "🛠 *פאנל ניהול SLHNET – תקציר מיידי*",
-        "",
-        "💳 *סטטוס תשלומים:*",
-        f" - ממתינים: {approval_stats.get('pending', 0)}",
-        f" - אושרו: {approval_stats.get('approved', 0)}",
-        f" - נדחו: {approval_stats.get('rejected', 0)}",
-        "",
-        "🏦 *רזרבות ותזרים (Demo מה-DB):*",
-        f" - סכום רזרבה מצטבר: {reserve_stats.get('total_reserve', 0)}",
-        f" - סך נטו: {reserve_stats.get('total_net', 0)}",
-        f" - סך תשלומים: {reserve_stats.get('total_payments', 0)}",
-        "",
-        "💎 *שער SLH ודינמיקת מינט:*",
-        f" - מחיר נוכחי ל-SLH 1: ~{format_decimal_pretty(price_nis)} ₪",
-        f" - סכום כניסה (NIS_ENTRY_AMOUNT): ~{format_decimal_pretty(entry_nis)} ₪",
-        f" - SLH מחושב לכל כניסה: ~{format_decimal_pretty(compute_slh_for_entry(price_nis, entry_nis))} SLH",
-        f" - סך SLH שחולקו ללקוחות: ~{format_decimal_pretty(Decimal(str(cfg.get('total_slh_minted', 0.0))))} SLH",
-        "",
+    # אישור הקבלה למשתמש יוצא מיד, במקביל לרישום ב-DB ולהעברה לקבוצת הניהול
+    user_ack = asyncio.create_task(
+        chat.send_message(
+            "📥 קיבלנו את אישור התשלום שלך!\n"
+            "ההודעה הועברה לצוות הניהול. לאחר אישור, ישלח אליך קישור לקבוצת העסקים + זיכוי SLH בארנק הפנימי."
+        )
+    )
+
+    try:
+        await run_db(log_payment, user.id, user.username, pay_method)
+    except Exception as e:
+        logger.error(f"Error logging payment for user {user.id}: {e}")
+
+    # ההעברה לקבוצת הניהול מאוגדת ורצה ברקע – רק אחרי שהתשלום נרשם,
+    # כך שכפתור האישור תמיד מוצא את השורה ב-DB
+    if LOGS_CHAT_ID is not None:
+        PaymentProofBatcher.put(
+            user.id,
+            user.username,
+            chat.id,
+            message.message_id,
+            pay_method,
+            message.caption,
+        )
+
+    await user_ack
+
+
+# רשימת פקודות הניהול בסוף /admin – טקסט קבוע, מחובר פעם אחת
+ADMIN_COMMANDS_HELP = "\n".join(
+    (
         "📋 *פקודות ניהול זמינות (לשימושך ולמסמך ללקוחות):*",
         " - /pending  – רשימת תשלומים ממתינים",
         " - /approve <user_id>  – אישור תשלום: סטטוס + שליחת קישור לקבוצה + מינט SLH אוטומטי",
@@ -1169,33 +2036,206 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         "",
         " - /admin_credit <user_id> <amount_slh>",
         "     מאפשר לתת זיכוי SLH פנימי ידני למשתמש (לדוגמה: בונוס, תיקון טכני, מתנה).",
-    ]
+    )
+)
 
-    await chat.send_message("\n".join(text_lines))
 
+# פאנל /admin: תבנית אחת – כל קריאה היא format יחיד עם הנתונים החיים
+ADMIN_PANEL_TEMPLATE = (
+    "🛠 *פאנל ניהול SLHNET – תקציר מיידי*\n"
+    "\n"
+    "💳 *סטטוס תשלומים:*\n"
+    " - ממתינים: {pending}\n"
+    " - אושרו: {approved}\n"
+    " - נדחו: {rejected}\n"
+    "\n"
+    "🏦 *רזרבות ותזרים (Demo מה-DB):*\n"
+    " - סכום רזרבה מצטבר: {total_reserve}\n"
+    " - סך נטו: {total_net}\n"
+    " - סך תשלומים: {total_payments}\n"
+    "\n"
+    "💎 *שער SLH ודינמיקת מינט:*\n"
+    " - מחיר נוכחי ל-SLH 1: ~{price} ₪\n"
+    " - סכום כניסה (NIS_ENTRY_AMOUNT): ~{entry} ₪\n"
+    " - SLH מחושב לכל כניסה: ~{slh_per_entry} SLH\n"
+    " - סך SLH שחולקו ללקוחות: ~{total_minted} SLH\n"
+    "\n"
+    + _template_literal(ADMIN_COMMANDS_HELP)
+)
 
-async def pending_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+
+class _StatsDefaults(dict):
+    """מילון ל-format_map: מונה שחסר בסטטיסטיקות (DB ריק/לא זמין) מוצג כ-0."""
+
+    def __missing__(self, key: str) -> int:
+        return 0
+
+
+async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    פאנל ניהול בסיסי + מתקדם למנהלים בלבד.
+    """
     user = update.effective_user
     chat = update.effective_chat
     if not user or not chat:
         return
 
     if not is_admin(user.id):
-        await chat.send_message("❌ הפקודה /pending מיועדת למנהלי המערכת בלבד.")
+        await chat.send_message("❌ הפקודה /admin מיועדת למנהלי המערכת בלבד.")
         return
 
-    pending = get_pending_payments(limit=30)
+    approval_stats, reserve_stats = await asyncio.gather(
+        get_stats_cached(get_approval_stats),
+        get_stats_cached(get_reserve_stats),
+    )
+    cfg = load_dynamic_config()
+    price_nis, entry_nis = get_current_price_and_entry(cfg)
+
+    # הסטטיסטיקות נכנסות לתבנית כמו שהן; מה שלא הוחזר מה-DB מקבל 0
+    values = _StatsDefaults(approval_stats or {})
+    values.update(reserve_stats or {})
+    values.update(
+        price=format_decimal_pretty(price_nis),
+        entry=format_decimal_pretty(entry_nis),
+        slh_per_entry=format_decimal_pretty(compute_slh_for_entry(price_nis, entry_nis)),
+        total_minted=format_decimal_pretty(
+            Decimal(str(cfg.get("total_slh_minted", 0.0)))
+        ),
+    )
+    await chat.send_message(ADMIN_PANEL_TEMPLATE.format_map(values))
+
+
+PENDING_PAGE_SIZE = 30
+
+
+def build_pending_page(before_id: Optional[int] = None) -> tuple:
+    """
+    עמוד אחד של /pending (מהחדש לישן). אם העמוד מלא – מצורף כפתור "הבא"
+    עם ה-id האחרון, והעמוד הבא נשלף ב-keyset ((created_at, id) אחרי השורה
+    הזו) בלי לסרוק שוב.
+    """
+    pending = get_pending_payments(limit=PENDING_PAGE_SIZE, before_id=before_id)
     if not pending:
-        await chat.send_message("✅ אין תשלומים ממתינים כרגע.")
+        if before_id is None:
+            return "✅ אין תשלומים ממתינים כרגע.", None
+        return "✅ אין תשלומים ממתינים נוספים.", None
+
+    body = "\n".join(
+        f"• user_id={p['user_id']} | username=@{p['username'] or 'לא ידוע'} | שיטה={p['pay_method']} | id={p['id']}"
+        for p in pending
+    )
+    keyboard = None
+    if len(pending) == PENDING_PAGE_SIZE:
+        next_button = InlineKeyboardButton(
+            "▶ הבא", callback_data=f"pending_next:{pending[-1]['id']}"
+        )
+        keyboard = InlineKeyboardMarkup([[next_button]])
+    return f"💳 *תשלומים ממתינים:*\n\n{body}", keyboard
+
+
+async def handle_pending_next_callback(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str
+) -> None:
+    """כפתור "הבא" ברשימת /pending – callback_data בפורמט pending_next:<last_id>."""
+    query = update.callback_query
+    if not is_admin(query.from_user.id):
+        await query.answer("רק מנהל יכול לצפות בתשלומים ממתינים.", show_alert=True)
+        return
+    try:
+        before_id = int(arg)
+    except ValueError:
+        await query.answer("עמוד לא תקין.", show_alert=True)
+        return
+
+    text, keyboard = await run_db(build_pending_page, before_id)
+    await asyncio.gather(
+        query.answer(), query.edit_message_text(text, reply_markup=keyboard)
+    )
+
+
+async def pending_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = update.effective_user
+    chat = update.effective_chat
+    if not user or not chat:
         return
 
-    lines = ["💳 *תשלומים ממתינים:*", ""]
-    for p in pending:
-        lines.append(
-            f"• user_id={p['user_id']} | username=@{p['username'] or 'לא ידוע'} | שיטה={p['pay_method']} | id={p['id']}"
+    if not is_admin(user.id):
+        await chat.send_message("❌ הפקודה /pending מיועדת למנהלי המערכת בלבד.")
+        return
+
+    text, keyboard = await run_db(build_pending_page)
+    await chat.send_message(text, reply_markup=keyboard)
+
+
+# שורת הזיכוי שמצורפת להודעת האישור למשתמש (משותפת ל-/approve ולכפתור האישור)
+APPROVAL_CREDIT_TEMPLATE = "\n\nכחלק מההצטרפות קיבלת *{amount}* SLH פנימי לארנק שלך."
+
+
+# הודעות האישור: הקישורים הקבועים (קבוצה, קידומת ההפניה) כבר בתוך התבנית,
+# וכל שליחה היא format אחד עם user_id והזיכוי
+APPROVAL_USER_TEMPLATE = (
+    "✅ התשלום שלך אושר!\n\n"
+    "הנה הקישור להצטרפות לקהילת העסקים שלנו:\n"
+    + _template_literal(GROUP_URL)
+    + "\n\nבנוסף, זה הקישור האישי שלך להזמנת חברים:\n"
+    + _template_literal(REFERRAL_LINK_PREFIX)
+    + "{user_id}\n"
+    "{extra_slh}\n\n"
+    "תוכל תמיד לקבל את הקישור האישי שוב בפקודה /my_link.\n"
+    "ברוך הבא 🙌"
+)
+APPROVAL_ADMIN_TEMPLATE = (
+    "✅ התשלום של המשתמש {user_id} אושר ונשלח לו קישור לקבוצה + לינק אישי."
+)
+APPROVAL_ADMIN_MINT_TEMPLATE = "\nנמינטו לו {amount} SLH פנימיים."
+
+
+def _resolve_mint_call() -> Callable[[int, Decimal, str], Any]:
+    """
+    קובע פעם אחת (לפי החתימה של mint_slh_from_payment) איך מבצעים מינט,
+    במקום לנסות קריאה ולתפוס TypeError בכל אישור תשלום.
+    בגירסה הנוכחית של slh_internal_wallets הפונקציה מקבלת רק סכום בש"ח ומחשבת
+    כמות, כך שאף אחת מצורות הקריאה לא נתמכת – בדיוק כמו קודם, המינט נכשל
+    (TypeError) ולא מזוכה שום ארנק.
+    """
+    try:
+        arity = len(inspect.signature(mint_slh_from_payment).parameters)
+    except (TypeError, ValueError):
+        arity = 3
+
+    if arity >= 3:
+        return mint_slh_from_payment
+    if arity == 2:
+        return lambda user_id, amount_slh, reason: mint_slh_from_payment(
+            user_id, amount_slh
         )
 
-    await chat.send_message("\n".join(lines))
+    def _unsupported(user_id: int, amount_slh: Decimal, reason: str) -> None:
+        raise TypeError(
+            "mint_slh_from_payment does not accept (user_id, amount_slh[, reason])"
+        )
+
+    return _unsupported
+
+
+mint_internal_slh = _resolve_mint_call()
+
+
+@lru_cache(maxsize=8192)
+def ensure_wallet_once(user_id: int) -> bool:
+    """
+    ensure_internal_wallet(user_id, None) פעם אחת לכל משתמש בתהליך.
+    ארנק שנוצר לא נמחק, ולכן אין צורך לחזור ל-DB בכל אישור/זיכוי.
+    חריגה לא נשמרת ב-cache – הקריאה הבאה תנסה שוב.
+    """
+    ensure_internal_wallet(user_id, None)
+    return True
+
+
+def mint_and_record(user_id: int, amount_slh: Decimal, reason: str) -> None:
+    """מינט בפועל + עדכון סך ה-SLH שחולקו – נקרא דרך run_db."""
+    mint_internal_slh(user_id, amount_slh, reason)
+    record_mint_amount(amount_slh)
 
 
 async def auto_mint_slh_for_entry(user_id: int) -> Optional[Decimal]:
@@ -1215,28 +2255,75 @@ async def auto_mint_slh_for_entry(user_id: int) -> Optional[Decimal]:
             f"{format_decimal_pretty(price_nis)} NIS per SLH"
         )
 
-        # מינט בפועל דרך מודול הארנקים
-        try:
-            mint_slh_from_payment(user_id, amount_slh, reason)
-        except TypeError:
-            # אם הפונקציה מוגדרת בגירסה ישנה עם פחות פרמטרים – נתמוך גם בה
-            mint_slh_from_payment(user_id, amount_slh)
-
-        record_mint_amount(amount_slh)
+        # מינט בפועל דרך מודול הארנקים (DB + קובץ הקונפיג – מחוץ ללולאה)
+        await run_db(mint_and_record, user_id, amount_slh, reason)
 
-        await send_log_message(
-            "💎 מינט SLH אוטומטי בעקבות תשלום מאושר:\n"
-            f"👤 user_id={user_id}\n"
-            f"📊 כמות: {format_decimal_pretty(amount_slh)} SLH\n"
-            f"🏷 סיבה: {reason}"
+        # הלוג לקבוצת הניהול לא צריך לעכב את תשובת האישור
+        spawn_background_task(
+            send_log_message(
+                "💎 מינט SLH אוטומטי בעקבות תשלום מאושר:\n"
+                f"👤 user_id={user_id}\n"
+                f"📊 כמות: {format_decimal_pretty(amount_slh)} SLH\n"
+                f"🏷 סיבה: {reason}"
+            ),
+            name=f"mint_log:{user_id}",
         )
 
         return amount_slh
     except Exception as e:
-        logger.error(f"auto_mint_slh_for_entry error for user {user_id}: {e}")
+        logger.error("auto_mint_slh_for_entry error for user %s: %s", user_id, e)
         return None
 
 
+async def approve_payment(target_id: int, note: str) -> str:
+    """
+    מסלול האישור המשותף ל-/approve ולכפתור בקבוצת הניהול:
+    עדכון סטטוס + ארנק, מינט SLH ותור הודעת המשתמש. מחזיר את הודעת המנהל.
+    חריגה מעדכון הסטטוס עוברת הלאה לקורא.
+    """
+    await asyncio.gather(
+        PaymentStatusBatcher.submit(target_id, "approved", note),
+        run_db(ensure_wallet_once, target_id),
+    )
+    remember_approved_payment(target_id)
+    invalidate_stats_cache()
+
+    # מינט SLH לפי שער נוכחי
+    minted = await auto_mint_slh_for_entry(target_id)
+    minted_str = format_decimal_pretty(minted) if minted else None
+
+    extra_slh = APPROVAL_CREDIT_TEMPLATE.format(amount=minted_str) if minted_str else ""
+    queue_user_message(
+        target_id, APPROVAL_USER_TEMPLATE.format(user_id=target_id, extra_slh=extra_slh)
+    )
+
+    admin_msg = APPROVAL_ADMIN_TEMPLATE.format(user_id=target_id)
+    if minted_str:
+        admin_msg += APPROVAL_ADMIN_MINT_TEMPLATE.format(amount=minted_str)
+    return admin_msg
+
+
+async def reject_payment(
+    target_id: int, note: str, user_reason: Optional[str] = None
+) -> str:
+    """
+    מסלול הדחייה המשותף ל-/reject ולכפתור בקבוצת הניהול. מחזיר את הודעת המנהל.
+    user_reason – סיבה שמוצגת למשתמש (בכפתור אין סיבה מפורטת).
+    """
+    await PaymentStatusBatcher.submit(target_id, "rejected", note)
+    forget_approved_payment(target_id)
+    invalidate_stats_cache()
+
+    reason_line = f"סיבה: {user_reason}\n\n" if user_reason else ""
+    queue_user_message(
+        target_id,
+        "❌ התשלום שלך נדחה.\n"
+        f"{reason_line}"
+        "אם לדעתך מדובר בטעות, ניתן לפנות לתמיכה.",
+    )
+    return f"🚫 התשלום של המשתמש {target_id} נדחה ונשלחה לו הודעה."
+
+
 async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     אישור תשלום ידני לפי user_id – למנהלים בלבד.
@@ -1262,51 +2349,12 @@ async def approve_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     try:
-        update_payment_status(target_id, "approved", "approved via /approve")
-        ensure_internal_wallet(target_id, None)
+        admin_msg = await approve_payment(target_id, "approved via /approve")
     except Exception as e:
-        logger.error(f"Error updating payment status for {target_id}: {e}")
+        logger.error("Error updating payment status for %s: %s", target_id, e)
         await chat.send_message("❌ שגיאה בעדכון סטטוס התשלום.")
         return
 
-    # מינט SLH לפי שער נוכחי
-    minted = await auto_mint_slh_for_entry(target_id)
-    minted_str = format_decimal_pretty(minted) if minted else None
-
-    group_url = safe_get_url(
-        Config.BUSINESS_GROUP_URL or Config.GROUP_STATIC_INVITE, Config.LANDING_URL
-    )
-    referral_link = f"https://t.me/{Config.BOT_USERNAME}?start={target_id}"
-
-    try:
-        extra_slh = (
-            f"\n\nכחלק מההצטרפות קיבלת *{minted_str}* SLH פנימי לארנק שלך."
-            if minted_str
-            else ""
-        )
-        await context.bot.send_message(
-            chat_id=target_id,
-            text=(
-                "✅ התשלום שלך אושר!\n\n"
-                "הנה הקישור להצטרפות לקהילת העסקים שלנו:\n"
-                f"{group_url}\n\n"
-                "בנוסף, זה הקישור האישי שלך להזמנת חברים:\n"
-                f"{referral_link}\n"
-                f"{extra_slh}\n\n"
-                "תוכל תמיד לקבל את הקישור האישי שוב בפקודה /my_link.\n"
-                "ברוך הבא 🙌"
-            ),
-            
-        )
-    except Exception as e:
-        logger.error(f"Error sending approval message to user {target_id}: {e}")
-
-    admin_msg = (
-        f"✅ התשלום של המשתמש {target_id} אושר ונשלח לו קישור לקבוצה + לינק אישי."
-    )
-    if minted_str:
-        admin_msg += f"\nנמינטו לו {minted_str} SLH פנימיים."
-
     await chat.send_message(admin_msg)
 
 
@@ -1323,38 +2371,27 @@ async def reject_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await chat.send_message("❌ הפקודה /reject מיועדת למנהלי המערכת בלבד.")
         return
 
-    if len(context.args) < 1:
+    args = context.args
+    if not args:
         await chat.send_message("שימוש: /reject <user_id> <סיבה>")
         return
 
     try:
-        target_id = int(context.args[0])
+        target_id = int(args[0])
     except ValueError:
         await chat.send_message("user_id לא תקין.")
         return
 
-    reason = " ".join(context.args[1:]) if len(context.args) > 1 else "ללא סיבה מפורטת"
+    reason = " ".join(args[1:]) or "ללא סיבה מפורטת"
 
     try:
-        update_payment_status(target_id, "rejected", reason)
+        admin_msg = await reject_payment(target_id, reason, user_reason=reason)
     except Exception as e:
-        logger.error(f"Error updating payment status for {target_id}: {e}")
+        logger.error("Error updating payment status for %s: %s", target_id, e)
         await chat.send_message("❌ שגיאה בעדכון סטטוס התשלום.")
         return
 
-    try:
-        await context.bot.send_message(
-            chat_id=target_id,
-            text=(
-                "❌ התשלום שלך נדחה.\n"
-                f"סיבה: {reason}\n\n"
-                "אם לדעתך מדובר בטעות, ניתן לפנות לתמיכה."
-            ),
-        )
-    except Exception as e:
-        logger.error(f"Error sending rejection message to user {target_id}: {e}")
-
-    await chat.send_message(f"🚫 התשלום של המשתמש {target_id} נדחה ונשלחה לו הודעה.")
+    await chat.send_message(admin_msg)
 
 
 async def set_price_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1385,11 +2422,8 @@ async def set_price_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
 
-    try:
-        new_price = Decimal(context.args[0].replace(",", "."))
-        if new_price <= 0:
-            raise InvalidOperation
-    except InvalidOperation:
+    new_price = parse_amount(context.args[0])
+    if new_price is None or new_price <= 0:
         await chat.send_message("מחיר לא תקין. השתמש במספר גדול מאפס, לדוגמה: 444")
         return
 
@@ -1483,38 +2517,25 @@ async def admin_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     try:
-        ensure_internal_wallet(target_id, None)
-        overview = get_wallet_overview(target_id) or {}
-        stakes = get_user_stakes(target_id) or []
+        overview, stakes = await run_db(get_wallet_and_stakes, target_id, None)
     except Exception as e:
         logger.error(f"admin_user error for {target_id}: {e}")
         await chat.send_message("❌ לא ניתן לטעון את נתוני המשתמש.")
         return
 
     # ארנק פנימי
-    try:
-        balance = Decimal(str(overview.get("balance_slh", "0")))
-    except Exception:
-        balance = Decimal("0")
-
+    balance, total_staked = wallet_totals(overview)
     wallet_id = overview.get("wallet_id", "?")
 
-    total_staked = Decimal("0")
-    for s in stakes:
-        try:
-            total_staked += Decimal(str(s.get("amount_slh", "0")))
-        except Exception:
-            continue
-
     # הפניות
-    refs = load_referrals()
+    refs = await load_referrals_async()
     udata = refs.get("users", {}).get(str(target_id), {})
     my_ref_count = udata.get("referral_count", 0)
     joined_at = udata.get("joined_at", "לא ידוע")
     referrer = udata.get("referrer", "N/A")
 
     price_nis, _ = get_current_price_and_entry()
-    wallet_value_nis = balance * price_nis if price_nis > 0 else Decimal("0")
+    wallet_value_nis = balance * price_nis if price_nis > 0 else DECIMAL_ZERO
 
     # ארנק חיצוני אישי
     onchain = get_onchain_wallet(target_id)
@@ -1563,61 +2584,64 @@ async def admin_credit_command(update: Update, context: ContextTypes.DEFAULT_TYP
         await chat.send_message("❌ הפקודה /admin_credit מיועדת למנהלי המערכת בלבד.")
         return
 
-    if len(context.args) < 2:
+    args = context.args
+    if len(args) < 2:
         await chat.send_message("שימוש: /admin_credit <user_id> <amount_slh>")
         return
 
     try:
-        target_id = int(context.args[0])
+        target_id = int(args[0])
     except ValueError:
         await chat.send_message("user_id לא תקין.")
         return
 
-    try:
-        amount = Decimal(context.args[1].replace(",", "."))
-        if amount <= 0:
-            raise InvalidOperation
-    except InvalidOperation:
+    amount = parse_amount(args[1])
+    if amount is None or amount <= 0:
         await chat.send_message("סכום SLH לא תקין. השתמש במספר גדול מאפס.")
         return
 
+    # רק הזיכוי עצמו עטוף ב-try: כשל בשליחת ההודעות אחריו לא אומר שהקרדיט נכשל
     try:
-        ensure_internal_wallet(target_id, None)
-        reason = f"Manual admin credit by {user.id}"
-        try:
-            mint_slh_from_payment(target_id, amount, reason)
-        except TypeError:
-            mint_slh_from_payment(target_id, amount)
-
-        record_mint_amount(amount)
-
-        await context.bot.send_message(
-            chat_id=target_id,
-            text=(
-                "💎 קיבלת זיכוי SLH מהמנהל.\n"
-                f"סכום: *{format_decimal_pretty(amount)}* SLH\n"
-                "הזיכוי הועבר לארנק הפנימי שלך בבוט.",
-            ),
-            
-        )
-
-        await chat.send_message(
-            f"✅ זוכו למשתמש {target_id} *{format_decimal_pretty(amount)}* SLH פנימיים.",
-            
-        )
-
-        await send_log_message(
-            "💎 קרדיט אדמין:\n"
-            f"👤 admin_id={user.id}\n"
-            f"👤 target_id={target_id}\n"
-            f"📊 amount={format_decimal_pretty(amount)} SLH"
+        await run_db(ensure_wallet_once, target_id)
+        await run_db(
+            mint_and_record, target_id, amount, f"Manual admin credit by {user.id}"
         )
     except Exception as e:
-        logger.error(f"admin_credit error for {target_id}: {e}")
+        logger.error("admin_credit error for %s: %s", target_id, e)
         await chat.send_message("❌ שגיאה בעת יצירת הקרדיט.")
+        return
+
+    amount_str = format_decimal_pretty(amount)
+
+    queue_user_message(
+        target_id,
+        "💎 קיבלת זיכוי SLH מהמנהל.\n"
+        f"סכום: *{amount_str}* SLH\n"
+        "הזיכוי הועבר לארנק הפנימי שלך בבוט.",
+    )
+
+    await chat.send_message(f"✅ זוכו למשתמש {target_id} *{amount_str}* SLH פנימיים.")
+
+    await send_log_message(
+        "💎 קרדיט אדמין:\n"
+        f"👤 admin_id={user.id}\n"
+        f"👤 target_id={target_id}\n"
+        f"📊 amount={amount_str} SLH"
+    )
 
 
 # ===== Wallet & staking =====
+def wallet_totals(overview: Dict[str, Any]) -> tuple:
+    """
+    (יתרה, סה״כ בסטייקינג) מתוצאת get_wallet_and_stakes.
+    הסכום מחושב כבר ב-SQL ושני הערכים Decimal – אין מעבר על השורות בפייתון.
+    """
+    return (
+        overview.get("balance_slh") or DECIMAL_ZERO,
+        overview.get("total_staked_slh") or DECIMAL_ZERO,
+    )
+
+
 async def wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     מציג למשתמש את ארנק ה-SLH הפנימי שלו + סטייקינג + מידע SLH/ש\"ח
@@ -1630,9 +2654,9 @@ async def wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     # === ארנק פנימי + סטייקינג ===
     try:
-        ensure_internal_wallet(user.id, user.username or None)
-        overview = get_wallet_overview(user.id) or {}
-        stakes = get_user_stakes(user.id) or []
+        overview, _ = await run_db(
+            get_wallet_and_stakes, user.id, user.username or None
+        )
     except Exception as e:
         logger.error(f"wallet_command error: {e}")
         await chat.send_message(
@@ -1640,25 +2664,14 @@ async def wallet_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
-    try:
-        balance = Decimal(str(overview.get("balance_slh", "0")))
-    except Exception:
-        balance = Decimal("0")
-
+    balance, total_staked = wallet_totals(overview)
     wallet_id = overview.get("wallet_id", "?")
 
-    total_staked = Decimal("0")
-    for s in stakes:
-        try:
-            total_staked += Decimal(str(s.get("amount_slh", "0")))
-        except Exception:
-            continue
-
     balance_str = format_decimal_pretty(balance)
     total_staked_str = format_decimal_pretty(total_staked)
 
     price_nis, _ = get_current_price_and_entry()
-    value_nis = balance * price_nis if price_nis > 0 else Decimal("0")
+    value_nis = balance * price_nis if price_nis > 0 else DECIMAL_ZERO
 
     # === ארנקי מערכת (חם/קר) ===
     hot = Config.HOT_WALLET_ADDRESS or "טרם הוגדר (HOT_WALLET_ADDRESS)"
@@ -1705,14 +2718,14 @@ async def send_slh_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     if not user or not chat:
         return
 
-    if len(context.args) < 2:
+    args = context.args
+    if len(args) < 2:
         await chat.send_message("שימוש: /send_slh <amount> <user_id>")
         return
 
-    amount_str, target = context.args[0], context.args[1]
-    try:
-        amount = Decimal(amount_str.replace(",", "."))
-    except InvalidOperation:
+    amount_str, target = args[0], args[1]
+    amount = parse_amount(amount_str)
+    if amount is None:
         await chat.send_message("סכום לא תקין. נסה שוב עם מספר תקין.")
         return
 
@@ -1722,7 +2735,7 @@ async def send_slh_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await chat.send_message("user_id חייב להיות מספרי.")
         return
 
-    ok, msg = transfer_between_users(user.id, to_user_id, amount)
+    ok, msg = await run_db(transfer_between_users, user.id, to_user_id, amount)
     if not ok:
         await chat.send_message(f"❌ העברה נכשלה: {msg}")
         return
@@ -1739,28 +2752,30 @@ async def stake_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not user or not chat:
         return
 
-    if not context.args:
+    args = context.args
+    if not args:
         await chat.send_message(
             "שימוש: /stake <amount> [days]. ברירת מחדל ימים: "
             f"{Config.STAKING_DEFAULT_DAYS}, APY: {Config.STAKING_DEFAULT_APY}%."
         )
         return
 
-    amount_str = context.args[0]
+    amount_str = args[0]
     days = Config.STAKING_DEFAULT_DAYS
-    if len(context.args) >= 2:
+    if len(args) >= 2:
         try:
-            days = int(context.args[1])
+            days = int(args[1])
         except ValueError:
             await chat.send_message("ערך ימים לא תקין, משתמש בברירת מחדל.")
 
-    try:
-        amount = Decimal(amount_str.replace(",", "."))
-    except InvalidOperation:
+    amount = parse_amount(amount_str)
+    if amount is None:
         await chat.send_message("סכום לא תקין. נסה שוב עם מספר תקין.")
         return
 
-    ok, msg = create_stake_position(user.id, amount, Config.STAKING_DEFAULT_APY, days)
+    ok, msg = await run_db(
+        create_stake_position, user.id, amount, Config.STAKING_DEFAULT_APY, days
+    )
     if not ok:
         await chat.send_message(f"❌ סטייקינג נכשל: {msg}")
         return
@@ -1780,23 +2795,19 @@ async def mystakes_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     if not user or not chat:
         return
 
-    stakes = get_user_stakes(user.id)
+    stakes = await run_db(get_user_stakes, user.id)
     if not stakes:
         await chat.send_message("אין לך עדיין עמדות סטייקינג.")
-        return
-
-    lines = ["📊 *עמדות הסטייקינג שלך:*\n"]
-    for st in stakes:
-        status = st.get("status", "unknown")
-        amount = format_decimal_pretty(Decimal(str(st.get("amount_slh", "0"))))
-        apy = st.get("apy", Decimal("0"))
-        lock_days = st.get("lock_days", 0)
-        started = st.get("started_at")
-        lines.append(
-            f"• {amount} SLH | {apy}% | {lock_days} ימים | סטטוס: {status} | התחלה: {started}"
-        )
+        return
 
-    await chat.send_message("\n".join(lines))
+    # השורות כבר מגיעות עם Decimal (psycopg2 + _stake_from_row) – בלי המרה נוספת
+    body = "\n".join(
+        f"• {format_decimal_pretty(st['amount_slh'])} SLH"
+        f" | {st.get('apy', DECIMAL_ZERO)}% | {st.get('lock_days', 0)} ימים"
+        f" | סטטוס: {st.get('status', 'unknown')} | התחלה: {st.get('started_at')}"
+        for st in stakes
+    )
+    await chat.send_message(f"📊 *עמדות הסטייקינג שלך:*\n\n{body}")
 
 
 # ===== Referrals & personal area =====
@@ -1809,10 +2820,10 @@ async def my_link_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not user or not chat:
         return
 
-    # ensure user exists in referrals db
-    register_referral(user.id, None)
+    # ensure user exists in referrals db – כתיבה רק אם עוד לא רשום
+    await register_referral_async(user.id, None)
 
-    link = f"https://t.me/{Config.BOT_USERNAME}?start={user.id}"
+    link = f"{REFERRAL_LINK_PREFIX}{user.id}"
     text = (
         "🔗 *הקישור האישי שלך להזמנת חברים:*\n\n"
         f"{link}\n\n"
@@ -1830,26 +2841,23 @@ async def my_referrals_command(update: Update, context: ContextTypes.DEFAULT_TYP
     if not user or not chat:
         return
 
-    refs = load_referrals()
+    refs = await load_referrals_async()
     udata = refs.get("users", {}).get(str(user.id), {})
     count = udata.get("referral_count", 0)
-    referred_ids = get_user_referrals(user.id)
-
-    lines = [
-        "👥 *הפניות על שמך:*",
-        f"🔢 סה\"כ הפניות: {count}",
-        "",
-        "רשימה (עד 10 ראשונים, לפי ID):",
-    ]
+    referred_ids = refs["by_referrer"].get(str(user.id), [])
 
-    if not referred_ids:
-        lines.append("אין עדיין רשומות.\n\nהמשך להזמין אנשים דרך הקישור האישי שלך!")
+    if referred_ids:
+        listing = "\n".join(f"• user_id = {rid}" for rid in referred_ids[:10]) + "\n"
     else:
-        for rid in referred_ids[:10]:
-            lines.append(f"• user_id = {rid}")
-        lines.append("\nהמשך להזמין אנשים דרך הקישור האישי שלך!")
+        listing = "אין עדיין רשומות.\n"
 
-    await chat.send_message("\n".join(lines))
+    await chat.send_message(
+        "👥 *הפניות על שמך:*\n"
+        f"🔢 סה\"כ הפניות: {count}\n\n"
+        "רשימה (עד 10 ראשונים, לפי ID):\n"
+        f"{listing}\n"
+        "המשך להזמין אנשים דרך הקישור האישי שלך!"
+    )
 
 
 async def portfolio_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1861,41 +2869,36 @@ async def portfolio_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not user or not chat:
         return
 
-    try:
-        ensure_internal_wallet(user.id, user.username or None)
-        overview = get_wallet_overview(user.id) or {}
-        stakes = get_user_stakes(user.id) or []
-    except Exception as e:
-        logger.error(f"portfolio_command error: {e}")
+    # הארנק (DB) וקובץ ההפניות (דיסק) בלתי תלויים – נטענים במקביל מחוץ ללולאת האירועים
+    wallet_result, refs = await asyncio.gather(
+        run_db(get_wallet_and_stakes, user.id, user.username or None),
+        load_referrals_async(),
+        return_exceptions=True,
+    )
+    if isinstance(wallet_result, BaseException):
+        logger.error("portfolio_command error: %s", wallet_result)
         await chat.send_message("❌ לא ניתן לטעון את הנתונים כרגע.")
         return
+    overview, stakes = wallet_result
+    if isinstance(refs, BaseException):
+        logger.error("portfolio_command referrals error: %s", refs)
+        refs = {}
 
-    try:
-        balance = Decimal(str(overview.get("balance_slh", "0")))
-    except Exception:
-        balance = Decimal("0")
-
-    total_staked = Decimal("0")
-    total_expected = Decimal("0")
-    for s in stakes:
-        try:
-            amt = Decimal(str(s.get("amount_slh", "0")))
-            apy = Decimal(str(s.get("apy", "0")))
-            total_staked += amt
-            total_expected += amt + (amt * apy / Decimal("100"))
-        except Exception:
-            continue
+    balance, total_staked = wallet_totals(overview)
+    # הערכים כבר Decimal (slh_internal_wallets ממיר בקריאה מה-DB)
+    total_expected = total_staked + sum(
+        (s["amount_slh"] * s["apy"] for s in stakes), DECIMAL_ZERO
+    ) / DECIMAL_HUNDRED
 
     balance_str = format_decimal_pretty(balance)
     total_staked_str = format_decimal_pretty(total_staked)
     total_expected_str = format_decimal_pretty(total_expected)
 
-    refs = load_referrals()
     udata = refs.get("users", {}).get(str(user.id), {})
     my_ref_count = udata.get("referral_count", 0)
 
     price_nis, _ = get_current_price_and_entry()
-    value_nis = balance * price_nis if price_nis > 0 else Decimal("0")
+    value_nis = balance * price_nis if price_nis > 0 else DECIMAL_ZERO
 
     text = (
         "📊 *האזור האישי שלך – SLHNET*\n\n"
@@ -1996,6 +2999,20 @@ async def onchain_wallet_command(update: Update, context: ContextTypes.DEFAULT_T
 
 
 # ===== Callback queries =====
+# מקלדות מסכי המידע קבועות – נבנות פעם אחת ומשותפות לכל המשתמשים
+INVESTOR_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [BTN_BACK_TO_MAIN],
+        [
+            InlineKeyboardButton(
+                "🐞 דיווח באג במסך זה",
+                callback_data="report_bug:investor_screen",
+            )
+        ],
+    ]
+)
+
+
 async def handle_investor_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     if not query:
@@ -2009,48 +3026,45 @@ async def handle_investor_callback(update: Update, context: ContextTypes.DEFAULT
             "ניתן להצטרף כשותף, להחזיק טוקן SLH ולקבל חלק מהתנועה במערכת."
         ),
     )
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "🔙 חזרה לתפריט הראשי", callback_data="back_to_main"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "🐞 דיווח באג במסך זה",
-                    callback_data="report_bug:investor_screen",
-                )
-            ],
-        ]
-    )
-    await query.edit_message_text(
-        text=investor_text, reply_markup=keyboard
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(text=investor_text, reply_markup=INVESTOR_KEYBOARD),
     )
 
 
+PAYMENT_INSTRUCTIONS_FOOTER = (
+    "\nלאחר שביצעת תשלום באחד האמצעים למעלה:\n"
+    "1️⃣ שמור צילום מסך ברור של אישור התשלום (או קובץ PDF / מסמך מהבנק).\n"
+    "2️⃣ שלח את צילום המסך כאן בצ׳אט עם הבוט.\n"
+    "3️⃣ המערכת תעביר את האישור אוטומטית לקבוצת הניהול.\n\n"
+    "אחרי שהאדמין יאשר – תקבל קישור לקבוצת העסקים + זיכוי SLH בארנק הפנימי."
+)
+
+BANK_TRANSFER_TEXT = (
+    "🏦 *תשלום בהעברה בנקאית*\n\n"
+    "פרטי החשבון:\n"
+    "בנק הפועלים\n"
+    "סניף כפר גנים (153)\n"
+    "חשבון 73462\n"
+    "המוטב: קאופמן צביקה\n"
+    + PAYMENT_INSTRUCTIONS_FOOTER
+)
+
+PAYMENT_MENU_TEXT = (
+    "💳 *איך לשלם ולשלוח אישור*\n\n"
+    "בחר אחד מאמצעי התשלום למטה לקבלת הוראות מדויקות.\n"
+    "לאחר התשלום, שלח כאן לבוט צילום מסך של האישור."
+)
+
+
 def build_payment_instructions_text(method: str) -> str:
     """
     בונה טקסט מסודר לכל אפשרויות התשלום והוראות שליחת האישור.
     """
-    base_footer = (
-        "\nלאחר שביצעת תשלום באחד האמצעים למעלה:\n"
-        "1️⃣ שמור צילום מסך ברור של אישור התשלום (או קובץ PDF / מסמך מהבנק).\n"
-        "2️⃣ שלח את צילום המסך כאן בצ׳אט עם הבוט.\n"
-        "3️⃣ המערכת תעביר את האישור אוטומטית לקבוצת הניהול.\n\n"
-        "אחרי שהאדמין יאשר – תקבל קישור לקבוצת העסקים + זיכוי SLH בארנק הפנימי."
-    )
+    base_footer = PAYMENT_INSTRUCTIONS_FOOTER
 
     if method == "bank":
-        return (
-            "🏦 *תשלום בהעברה בנקאית*\n\n"
-            "פרטי החשבון:\n"
-            "בנק הפועלים\n"
-            "סניף כפר גנים (153)\n"
-            "חשבון 73462\n"
-            "המוטב: קאופמן צביקה\n"
-            + base_footer
-        )
+        return BANK_TRANSFER_TEXT
     if method == "paybox":
         return (
             "📲 *תשלום ב-PayBox*\n\n"
@@ -2079,6 +3093,36 @@ def build_payment_instructions_text(method: str) -> str:
     return "שגיאה: אמצעי תשלום לא ידוע."
 
 
+def build_payment_method_keyboard(method: str) -> InlineKeyboardMarkup:
+    """
+    מקלדת מסך אמצעי תשלום – זהה לכל האמצעים פרט לכפתור דיווח הבאג.
+    """
+    return InlineKeyboardMarkup(
+        [
+            [BTN_SEND_PROOF_NOW],
+            [BTN_BACK_TO_PAYMENTS],
+            [BTN_HOME],
+            [
+                InlineKeyboardButton(
+                    "🐞 דיווח באג במסך זה",
+                    callback_data=f"report_bug:pay_{method}",
+                )
+            ],
+        ]
+    )
+
+
+# הטקסטים והמקלדות תלויים רק ב-Config (קבוע לאורך חיי התהליך),
+# ולכן נבנים פעם אחת בטעינת המודול במקום בכל לחיצה.
+PAYMENT_METHODS = ("bank", "paybox", "bit", "paypal", "ton")
+PAYMENT_METHOD_TEXTS: Dict[str, str] = {
+    m: build_payment_instructions_text(m) for m in PAYMENT_METHODS
+}
+PAYMENT_METHOD_KEYBOARDS: Dict[str, InlineKeyboardMarkup] = {
+    m: build_payment_method_keyboard(m) for m in PAYMENT_METHODS
+}
+
+
 async def handle_send_proof_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     מסך מרכזי: איך לשלם ולשלוח אישור – ממנו בוחרים אמצעי תשלום.
@@ -2086,13 +3130,12 @@ async def handle_send_proof_menu(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     if not query:
         return
-    text = (
-        "💳 *איך לשלם ולשלוח אישור*\n\n"
-        "בחר אחד מאמצעי התשלום למטה לקבלת הוראות מדויקות.\n"
-        "לאחר התשלום, שלח כאן לבוט צילום מסך של האישור."
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(
+            text=PAYMENT_MENU_TEXT, reply_markup=PAYMENT_MENU_KEYBOARD
+        ),
     )
-    keyboard = build_payment_menu_keyboard()
-    await query.edit_message_text(text=text, reply_markup=keyboard)
 
 
 async def handle_payment_method_callback(
@@ -2104,29 +3147,27 @@ async def handle_payment_method_callback(
     query = update.callback_query
     if not query:
         return
-    text = build_payment_instructions_text(method)
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "📤 שלח עכשיו צילום מסך", callback_data="send_proof_menu"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "🔙 חזרה לאפשרויות תשלום", callback_data="send_proof_menu"
-                )
-            ],
-            [InlineKeyboardButton("🏠 חזרה לתפריט הראשי", callback_data="back_to_main")],
-            [
-                InlineKeyboardButton(
-                    "🐞 דיווח באג במסך זה",
-                    callback_data=f"report_bug:pay_{method}",
-                )
-            ],
-        ]
+    text = PAYMENT_METHOD_TEXTS.get(method) or build_payment_instructions_text(method)
+    keyboard = PAYMENT_METHOD_KEYBOARDS.get(method) or build_payment_method_keyboard(
+        method
     )
-    await query.edit_message_text(text=text, reply_markup=keyboard)
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(text=text, reply_markup=keyboard),
+    )
+
+
+BENEFITS_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [BTN_BACK_TO_MAIN],
+        [
+            InlineKeyboardButton(
+                "🐞 דיווח באג במסך זה",
+                callback_data="report_bug:benefits_screen",
+            )
+        ],
+    ]
+)
 
 
 async def handle_benefits_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -2145,26 +3186,32 @@ async def handle_benefits_callback(update: Update, context: ContextTypes.DEFAULT
             "אחרי התשלום ושליחת האישור – אתה מקבל קישור לקבוצה + סט כלים דיגיטליים להתחלה."
         ),
     )
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "🔙 חזרה לתפריט הראשי", callback_data="back_to_main"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "🐞 דיווח באג במסך זה",
-                    callback_data="report_bug:benefits_screen",
-                )
-            ],
-        ]
-    )
-    await query.edit_message_text(
-        text=benefits_text, reply_markup=keyboard
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(text=benefits_text, reply_markup=BENEFITS_KEYBOARD),
     )
 
 
+PERSONAL_AREA_TEXT = (
+    "👤 *האזור האישי שלך*\n\n"
+    "לקבלת סיכום מלא (ארנק, סטייקינג והפניות):\n"
+    "השתמש בפקודה /portfolio בצ׳אט עם הבוט.\n\n"
+    "בהמשך נוסיף כאן שאלון קצר כדי להכיר אותך טוב יותר ולחבר אותך\n"
+    "למומחים ולעסקים הרלוונטיים לך."
+)
+PERSONAL_AREA_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [BTN_HOME],
+        [
+            InlineKeyboardButton(
+                "🐞 דיווח באג במסך זה",
+                callback_data="report_bug:personal_area",
+            )
+        ],
+    ]
+)
+
+
 async def handle_personal_area_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     מסך מקוצר שהולך לכיוון האזור האישי – future-ready לשאלון אישי.
@@ -2173,29 +3220,12 @@ async def handle_personal_area_callback(update: Update, context: ContextTypes.DE
     query = update.callback_query
     if not query:
         return
-    text = (
-        "👤 *האזור האישי שלך*\n\n"
-        "לקבלת סיכום מלא (ארנק, סטייקינג והפניות):\n"
-        "השתמש בפקודה /portfolio בצ׳אט עם הבוט.\n\n"
-        "בהמשך נוסיף כאן שאלון קצר כדי להכיר אותך טוב יותר ולחבר אותך\n"
-        "למומחים ולעסקים הרלוונטיים לך."
-    )
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "🏠 חזרה לתפריט הראשי", callback_data="back_to_main"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "🐞 דיווח באג במסך זה",
-                    callback_data="report_bug:personal_area",
-                )
-            ],
-        ]
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(
+            text=PERSONAL_AREA_TEXT, reply_markup=PERSONAL_AREA_KEYBOARD
+        ),
     )
-    await query.edit_message_text(text=text, reply_markup=keyboard)
 
 
 async def handle_bug_report_callback(
@@ -2214,144 +3244,155 @@ async def handle_bug_report_callback(
     user = query.from_user
     chat = query.message.chat if query.message else None
 
-    await send_bug_report(feature_id, user, chat)
+    await send_bug_report(feature_id or "unknown_feature", user, chat)
+
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(
+            "🐞 תודה שדיווחת על תקלה!\n"
+            "הודעה נשלחה לצוות הפיתוח עם פרטי השלב שבו לחצת.\n"
+            "במידת הצורך נחזור אליך דרך הבוט או קבוצת התמיכה."
+        ),
+    )
+
+
+PAYMENT_REVIEW_ID_RE = re.compile(r"-?\d+")
+
+
+async def edit_payment_review_message(query, target_id: int, result_text: str) -> None:
+    """
+    מעדכן את הודעת האישור בקבוצת הניהול אחרי אישור/דחייה.
+    בהודעת סיכום של כמה משתמשים (PaymentProofBatcher) מסירים רק את שורת
+    הכפתורים של המשתמש ומוסיפים את התוצאה לטקסט, כדי לא למחוק את השאר.
+    """
+    message = query.message
+    if message is not None and message.text is None:
+        # אישור בודד שהועתק כמדיה – הפרטים בכיתוב, לכן מעדכנים את הכיתוב
+        room = PaymentProofBatcher.CAPTION_LIMIT - len(result_text) - 2
+        await query.edit_message_caption(
+            caption=f"{(message.caption or '')[:room]}\n\n{result_text}",
+            reply_markup=None,
+        )
+        return
+    markup = message.reply_markup if message else None
+    if markup is None or len(markup.inline_keyboard) <= 1:
+        await query.edit_message_text(result_text)
+        return
 
+    own = (f"approve:{target_id}", f"reject:{target_id}")
+    rows = [
+        row
+        for row in markup.inline_keyboard
+        if not any(button.callback_data in own for button in row)
+    ]
     await query.edit_message_text(
-        "🐞 תודה שדיווחת על תקלה!\n"
-        "הודעה נשלחה לצוות הפיתוח עם פרטי השלב שבו לחצת.\n"
-        "במידת הצורך נחזור אליך דרך הבוט או קבוצת התמיכה."
+        f"{message.text}\n\n{result_text}",
+        reply_markup=InlineKeyboardMarkup(rows) if rows else None,
     )
 
 
-async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def handle_payment_review_callback(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    arg: str,
+    approve: bool,
+) -> None:
+    """
+    כפתורי אישור/דחייה שמצורפים להודעת אישור התשלום בקבוצת הניהול.
+    callback_data בפורמט approve:<user_id> או reject:<user_id>.
+    """
     query = update.callback_query
     if not query:
         return
 
-    data = query.data or ""
-    await query.answer()
-
-    if data == "open_investor":
-        await handle_investor_callback(update, context)
-    elif data == "info_benefits":
-        await handle_benefits_callback(update, context)
-    elif data == "send_proof_menu":
-        await handle_send_proof_menu(update, context)
-    elif data == "back_to_main":
-        await send_start_screen(update, context)
-    elif data == "open_personal_area":
-        await handle_personal_area_callback(update, context)
-    elif data == "pay_bank":
-        await handle_payment_method_callback(update, context, "bank")
-    elif data == "pay_paybox":
-        await handle_payment_method_callback(update, context, "paybox")
-    elif data == "pay_bit":
-        await handle_payment_method_callback(update, context, "bit")
-    elif data == "pay_paypal":
-        await handle_payment_method_callback(update, context, "paypal")
-    elif data == "pay_ton":
-        await handle_payment_method_callback(update, context, "ton")
-    elif data.startswith("report_bug:"):
-        feature_id = data.split(":", 1)[1] or "unknown_feature"
-        await handle_bug_report_callback(update, context, feature_id)
-    elif data.startswith("approve:"):
-        if not is_admin(query.from_user.id):
-            await query.answer("רק מנהל יכול לאשר תשלום.", show_alert=True)
-            return
-        try:
-            target_id = int(data.split(":", 1)[1])
-        except ValueError:
-            await query.answer("user_id לא תקין.", show_alert=True)
-            return
+    if not is_admin(query.from_user.id):
+        await query.answer(
+            "רק מנהל יכול לאשר תשלום." if approve else "רק מנהל יכול לדחות תשלום.",
+            show_alert=True,
+        )
+        return
 
-        try:
-            update_payment_status(target_id, "approved", "approved via inline button")
-            ensure_internal_wallet(target_id, None)
-        except Exception as e:
-            logger.error(f"Error updating payment status for {target_id}: {e}")
-            await query.answer("שגיאה בעדכון סטטוס התשלום.", show_alert=True)
-            return
+    if not PAYMENT_REVIEW_ID_RE.fullmatch(arg):
+        await query.answer("user_id לא תקין.", show_alert=True)
+        return
+    target_id = int(arg)
 
-        minted = await auto_mint_slh_for_entry(target_id)
-        minted_str = format_decimal_pretty(minted) if minted else None
+    try:
+        if approve:
+            admin_msg = await approve_payment(target_id, "approved via inline button")
+        else:
+            admin_msg = await reject_payment(target_id, "rejected via inline button")
+    except Exception as e:
+        logger.error("Error updating payment status for %s: %s", target_id, e)
+        await query.answer("שגיאה בעדכון סטטוס התשלום.", show_alert=True)
+        return
 
-        group_url = safe_get_url(
-            Config.BUSINESS_GROUP_URL or Config.GROUP_STATIC_INVITE,
-            Config.LANDING_URL,
-        )
-        referral_link = f"https://t.me/{Config.BOT_USERNAME}?start={target_id}"
+    await asyncio.gather(
+        query.answer(), edit_payment_review_message(query, target_id, admin_msg)
+    )
 
-        try:
-            extra_slh = (
-                f"\n\nכחלק מההצטרפות קיבלת *{minted_str}* SLH פנימי לארנק שלך."
-                if minted_str
-                else ""
-            )
-            await context.bot.send_message(
-                chat_id=target_id,
-                text=(
-                    "✅ התשלום שלך אושר!\n\n"
-                    "הנה הקישור להצטרפות לקהילת העסקים שלנו:\n"
-                    f"{group_url}\n\n"
-                    "בנוסף, זה הקישור האישי שלך להזמנת חברים:\n"
-                    f"{referral_link}\n"
-                    f"{extra_slh}\n\n"
-                    "תוכל תמיד לקבל אותו שוב בפקודה /my_link.\n"
-                    "ברוך הבא 🙌"
-                ),
-                
-            )
-        except Exception as e:
-            logger.error(f"Error sending approval message to user {target_id}: {e}")
 
-        admin_msg = (
-            f"✅ התשלום של המשתמש {target_id} אושר ונשלח לו קישור לקבוצה + לינק אישי."
-        )
-        if minted_str:
-            admin_msg += f"\nנמינטו לו {minted_str} SLH פנימיים."
-        await query.edit_message_text(admin_msg)
-    elif data.startswith("reject:"):
-        if not is_admin(query.from_user.id):
-            await query.answer("רק מנהל יכול לדחות תשלום.", show_alert=True)
-            return
-        try:
-            target_id = int(data.split(":", 1)[1])
-        except ValueError:
-            await query.answer("user_id לא תקין.", show_alert=True)
-            return
+async def handle_back_to_main_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await asyncio.gather(update.callback_query.answer(), send_start_screen(update, context))
 
-        try:
-            update_payment_status(target_id, "rejected", "rejected via inline button")
-        except Exception as e:
-            logger.error(f"Error updating payment status (reject) for {target_id}: {e}")
-            await query.answer("שגיאה בעדכון סטטוס התשלום.", show_alert=True)
-            return
 
-        try:
-            await context.bot.send_message(
-                chat_id=target_id,
-                text=(
-                    "❌ התשלום שלך נדחה.\n"
-                    "אם לדעתך מדובר בטעות, ניתן לפנות לתמיכה."
-                ),
-            )
-        except Exception as e:
-            logger.error(f"Error sending rejection message to user {target_id}: {e}")
+# callback_data קבועים -> handler
+CALLBACK_HANDLERS: Dict[str, Callable[..., Coroutine[Any, Any, None]]] = {
+    "open_investor": handle_investor_callback,
+    "info_benefits": handle_benefits_callback,
+    "send_proof_menu": handle_send_proof_menu,
+    "back_to_main": handle_back_to_main_callback,
+    "open_personal_area": handle_personal_area_callback,
+    **{
+        f"pay_{method}": partial(handle_payment_method_callback, method=method)
+        for method in PAYMENT_METHODS
+    },
+}
 
-        await query.edit_message_text(
-            f"🚫 התשלום של המשתמש {target_id} נדחה ונשלחה לו הודעה."
-        )
-    else:
-        await query.edit_message_text("❌ פעולה לא מוכרת.")
+# callback_data עם פרמטר ("<קידומת>:<ארגומנט>") -> handler(update, context, arg).
+# חיפוש במילון לפי הקידומת – בלי שרשרת השוואות שגדלה עם כל סוג כפתור חדש.
+CALLBACK_PREFIX_HANDLERS: Dict[str, Callable[..., Coroutine[Any, Any, None]]] = {
+    "report_bug": handle_bug_report_callback,
+    "approve": partial(handle_payment_review_callback, approve=True),
+    "reject": partial(handle_payment_review_callback, approve=False),
+    "pending_next": handle_pending_next_callback,
+}
+
+
+async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    if not query:
+        return
+
+    # query.answer() נשלח מכל ענף יחד עם הפעולה הסופית (asyncio.gather),
+    # למעט כשלי הרשאה/קלט שעונים עם show_alert לפני היציאה.
+    data = query.data or ""
+
+    handler = CALLBACK_HANDLERS.get(data)
+    if handler is not None:
+        await handler(update, context)
+        return
+
+    prefix, sep, arg = data.partition(":")
+    handler = CALLBACK_PREFIX_HANDLERS.get(prefix) if sep else None
+    if handler is not None:
+        await handler(update, context, arg)
+        return
+
+    await asyncio.gather(
+        query.answer(), query.edit_message_text("❌ פעולה לא מוכרת.")
+    )
 
 
 async def echo_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     טיפול בהודעות טקסט חופשיות (לא פקודות).
     """
-    user = update.effective_user
-    text = update.message.text if update.message else ""
-    logger.info(f"Message from {user.id if user else '?'}: {text}")
+    # תוכן כל הודעה נרשם רק ב-DEBUG – בפרודקשן (INFO) לא משלמים על רשומה לכל הודעה
+    if logger.isEnabledFor(logging.DEBUG):
+        user = update.effective_user
+        text = update.message.text if update.message else ""
+        logger.debug("Message from %s: %s", user.id if user else "?", text)
     response = load_message_block(
         "ECHO_RESPONSE",
         (
@@ -2371,6 +3412,43 @@ async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
 
 
+# כל ה-handlers של הבוט – נבנים פעם אחת ונרשמים ב-TelegramAppManager.start
+TELEGRAM_HANDLERS = (
+    CommandHandler("start", start_command),
+    CommandHandler("whoami", whoami_command),
+    CommandHandler("stats", stats_command),
+    CommandHandler("help", help_command),
+
+    # אדמין – בסיס + מתקדם
+    CommandHandler("admin", admin_command),
+    CommandHandler("pending", pending_command),
+    CommandHandler("approve", approve_command),
+    CommandHandler("reject", reject_command),
+    CommandHandler("set_price", set_price_command),
+    CommandHandler("admin_wallet", admin_wallet_command),
+    CommandHandler("admin_user", admin_user_command),
+    CommandHandler("admin_credit", admin_credit_command),
+
+    # ארנק & סטייקינג & הפניות
+    CommandHandler("wallet", wallet_command),
+    CommandHandler("send_slh", send_slh_command),
+    CommandHandler("stake", stake_command),
+    CommandHandler("mystakes", mystakes_command),
+    CommandHandler("my_link", my_link_command),
+    CommandHandler("my_referrals", my_referrals_command),
+    CommandHandler("portfolio", portfolio_command),
+
+    # ארנק חיצוני אישי (בדיקות בלבד)
+    CommandHandler("onchain_wallet", onchain_wallet_command),
+    CommandHandler("set_wallet", set_wallet_command),
+
+    CallbackQueryHandler(callback_query_handler),
+    MessageHandler(filters.PHOTO | filters.Document.ALL, payment_proof_handler),
+    MessageHandler(filters.TEXT & ~filters.COMMAND, echo_message),
+    MessageHandler(filters.COMMAND, unknown_command),
+)
+
+
 # =========================
 # FastAPI routes
 # =========================
@@ -2379,13 +3457,18 @@ async def finance_metrics():
     """
     סטטוס כספי כולל – הכנסות, רזרבות, נטו ואישורים.
     """
-    reserve_stats = get_reserve_stats() or {}
-    approval_stats = get_approval_stats() or {}
-    return {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "reserve": reserve_stats,
-        "approvals": approval_stats,
-    }
+    reserve_stats, approval_stats = await asyncio.gather(
+        get_stats_cached(get_reserve_stats),
+        get_stats_cached(get_approval_stats),
+    )
+    # מוחזר כתשובה מוכנה – חוסך את המעבר הרקורסיבי של jsonable_encoder על כל poll
+    return DefaultJSONResponse(
+        {
+            "timestamp": utc_now_iso(),
+            "reserve": reserve_stats,
+            "approvals": approval_stats,
+        }
+    )
 
 
 @app.get("/api/metrics/monthly")
@@ -2394,14 +3477,16 @@ async def monthly_metrics():
     מדד פשוט של תשלומים חודשיים מה-DB (אם ממומש בצד db.py).
     """
     try:
-        data = get_monthly_payments() or []
+        data = await run_db(get_monthly_payments) or []
     except Exception as e:
         logger.error(f"Error fetching monthly payments: {e}")
         data = []
-    return {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "monthly_payments": data,
-    }
+    return DefaultJSONResponse(
+        {
+            "timestamp": utc_now_iso(),
+            "monthly_payments": data,
+        }
+    )
 
 
 @app.get("/api/debug/config", response_model=ConfigSnapshot)
@@ -2418,9 +3503,9 @@ async def referrals_summary():
     """
     סיכום הפניות דרך HTTP – future-ready ללוח בקרה חיצוני.
     """
-    data = load_referrals()
+    data = await load_referrals_async()
     return {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": utc_now_iso(),
         "statistics": data.get("statistics", {}),
         "users_count": len(data.get("users", {})),
     }
@@ -2434,27 +3519,15 @@ async def api_user_wallet(user_id: int):
     - כתובות BSC/TON (אם הוגדרו) – בדיקות בלבד.
     """
     try:
-        ensure_internal_wallet(user_id, None)
-        overview = get_wallet_overview(user_id) or {}
-        stakes = get_user_stakes(user_id) or []
+        overview, _ = await run_db(get_wallet_and_stakes, user_id, None)
     except Exception as e:
         logger.error(f"api_user_wallet error for {user_id}: {e}")
         raise
 
-    try:
-        balance = Decimal(str(overview.get("balance_slh", "0")))
-    except Exception:
-        balance = Decimal("0")
-
-    total_staked = Decimal("0")
-    for s in stakes:
-        try:
-            total_staked += Decimal(str(s.get("amount_slh", "0")))
-        except Exception:
-            continue
+    balance, total_staked = wallet_totals(overview)
 
     price_nis, _ = get_current_price_and_entry()
-    value_nis = balance * price_nis if price_nis > 0 else Decimal("0")
+    value_nis = balance * price_nis if price_nis > 0 else DECIMAL_ZERO
 
     onchain = get_onchain_wallet(user_id)
     bsc_addr = onchain.get("bsc")
@@ -2470,9 +3543,35 @@ async def api_user_wallet(user_id: int):
     )
 
 
+# גוף /metrics נשמר ל-METRICS_CACHE_TTL_SECONDS (גם בגרסה דחוסה), כך שכמה
+# scrapers לא מריצים את כל ה-collectors שוב ושוב; סריקות מקבילות ממתינות
+# ל-generate_latest אחד במקום להריץ כל אחת משלה
+METRICS_CACHE_TTL_SECONDS = float(os.getenv("METRICS_CACHE_TTL_SECONDS", "5"))
+_metrics_cache: Dict[str, Any] = {"expires": 0.0, "raw": b"", "gzip": None}
+_metrics_lock = asyncio.Lock()
+
+
 @app.get("/metrics")
-async def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+async def metrics(request: Request):
+    if _metrics_cache["expires"] <= time.monotonic():
+        async with _metrics_lock:
+            if _metrics_cache["expires"] <= time.monotonic():
+                # מעבר על ה-collectors וה-serialize רצים ב-thread, לא בלולאת האירועים
+                _metrics_cache["raw"] = await asyncio.to_thread(generate_latest)
+                _metrics_cache["gzip"] = None
+                _metrics_cache["expires"] = (
+                    time.monotonic() + METRICS_CACHE_TTL_SECONDS
+                )
+
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        if _metrics_cache["gzip"] is None:
+            _metrics_cache["gzip"] = gzip.compress(_metrics_cache["raw"], compresslevel=1)
+        return Response(
+            _metrics_cache["gzip"],
+            media_type=CONTENT_TYPE_LATEST,
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return Response(_metrics_cache["raw"], media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -2499,39 +3598,86 @@ async def landing(request: Request):
         "landing.html",
         {
             "request": request,
-            "landing_url": safe_get_url(Config.LANDING_URL, "https://slh-nft.com"),
-            "business_group_url": safe_get_url(
-                Config.BUSINESS_GROUP_URL, "https://slh-nft.com"
-            ),
+            "landing_url": LANDING_PAGE_URL,
+            "business_group_url": LANDING_PAGE_GROUP_URL,
         },
     )
 
 
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "256"))
+_update_semaphore = asyncio.Semaphore(WEBHOOK_MAX_CONCURRENCY)
+
+# בכיבוי: כמה זמן מחכים לעדכונים שכבר אושרו לטלגרם (בתוך graceful-timeout של gunicorn)
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "15"))
+# אחרי תחילת הכיבוי ה-webhook מחזיר 503 – טלגרם שולח את העדכון שוב למופע הבא
+_accepting_updates = True
+
+
+async def process_update_bounded(app_instance: Application, ptb_update: Update) -> None:
+    """
+    מעבד עדכון ברקע אחרי שה-webhook כבר החזיר 200 לטלגרם.
+    הסמפור מגביל את מספר העדכונים המעובדים במקביל; חריגות נרשמות ללוג
+    כי אין יותר מבקש שיראה אותן.
+    """
+    async with _update_semaphore:
+        try:
+            await app_instance.process_update(ptb_update)
+        except Exception:
+            logger.exception("Error processing update %s", ptb_update.update_id)
+
+
 @app.post("/webhook")
-async def telegram_webhook(update: TelegramWebhookUpdate):
+async def telegram_webhook(request: Request):
     """
     נקודת ה-webhook של טלגרם – Railway מפנה לכאן.
+    גוף הבקשה מפוענח ישירות ל-dict ומועבר ל-Update.de_json, בלי מודל Pydantic
+    ביניים (שהיה מאמת ומעתיק את כל העדכון פעם נוספת).
+    העיבוד עצמו רץ ברקע – טלגרם מקבל 200 מיד ולא מחכה לשרשרת ה-handlers.
     """
+    if (
+        WEBHOOK_SECRET_TOKEN is not None
+        and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET_TOKEN
+    ):
+        return DefaultJSONResponse({"status": "forbidden"}, status_code=403)
+
+    if not _accepting_updates:
+        return DefaultJSONResponse({"status": "shutting_down"}, status_code=503)
+
+    try:
+        raw_update = json_loads(await request.body())
+    except ValueError as e:
+        logger.warning(f"Webhook received invalid JSON: {e}")
+        return DefaultJSONResponse({"status": "invalid_json"}, status_code=400)
+    if not isinstance(raw_update, dict):
+        return DefaultJSONResponse({"status": "no_update"}, status_code=400)
+
     try:
-        TelegramAppManager.initialize_handlers()
         app_instance = TelegramAppManager.get_app()
-        raw_update = update.dict()
         ptb_update = Update.de_json(raw_update, app_instance.bot)
         if ptb_update:
-            await app_instance.process_update(ptb_update)
-            return JSONResponse({"status": "processed"})
+            spawn_background_task(
+                process_update_bounded(app_instance, ptb_update),
+                name=f"update-{ptb_update.update_id}",
+            )
+            return DefaultJSONResponse({"status": "queued"})
         else:
-            return JSONResponse({"status": "no_update"}, status_code=400)
+            return DefaultJSONResponse({"status": "no_update"}, status_code=400)
     except Exception as e:
         logger.error(f"Webhook error: {e}")
-        return JSONResponse({"status": "error", "detail": str(e)}, status_code=500)
+        return DefaultJSONResponse({"status": "error", "detail": str(e)}, status_code=500)
 
 
-@app.on_event("startup")
-async def startup_event():
+_schema_initialized = False
+
+
+def init_db_schemas() -> None:
     """
-    אתחול בסיסי של ה-DB ושל אפליקציית הטלגרם.
+    יצירת כל טבלאות ה-DB (init_schema כולל גם את טבלאות ההרחבה) –
+    פעם אחת בלבד לכל תהליך.
     """
+    global _schema_initialized
+    if _schema_initialized:
+        return
     try:
         init_schema()
     except Exception as e:
@@ -2540,6 +3686,15 @@ async def startup_event():
         init_internal_wallet_schema()
     except Exception as e:
         logger.warning(f"init_internal_wallet_schema failed: {e}")
+    _schema_initialized = True
+
+
+@app.on_event("startup")
+async def startup_event():
+    """
+    אתחול בסיסי של ה-DB ושל אפליקציית הטלגרם.
+    """
+    init_db_schemas()
 
     warnings = Config.validate()
     for w in warnings:
@@ -2552,6 +3707,27 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start Telegram Application: {e}")
 
+    TelegramSendQueue.start()
+    await asyncio.to_thread(preload_start_banner)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    כיבוי מסודר: עדכונים שכבר קיבלו 200 לא יישלחו שוב מטלגרם, ולכן מפסיקים
+    לקבל עדכונים חדשים, מחכים למשימות הרקע, מרוקנים את התורים – ורק אז
+    סוגרים את ה-DB_EXECUTOR (שהתורים עוד משתמשים בו).
+    """
+    global _accepting_updates
+    _accepting_updates = False
+    await drain_background_tasks(SHUTDOWN_DRAIN_SECONDS)
+
+    await PaymentStatusBatcher.stop()
+    await PaymentProofBatcher.stop()
+    await LogMessageBatcher.stop()
+    await TelegramSendQueue.stop()
+    await asyncio.to_thread(DB_EXECUTOR.shutdown, wait=True)
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -2563,6 +3739,20 @@ if __name__ == "__main__":
             print("  " + w)
 
     port = int(os.getenv("PORT", "8080"))
+    # reload רק לפיתוח מקומי (UVICORN_RELOAD=1); בפרודקשן – workers לפי WEB_CONCURRENCY.
+    # ברירת המחדל היא worker יחיד, כי ההפניות/פרופילים נשמרים בקבצי JSON מקומיים.
+    reload = os.getenv("UVICORN_RELOAD", "0") == "1"
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
     print(f"🚀 Starting SLHNET Bot on port {port}")
 
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True, log_config=None)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=reload,
+        workers=None if reload else workers,
+        # uvicorn[standard] מתקין uvloop + httptools; "auto" בוחר בהם כשהם זמינים
+        loop="auto",
+        http="auto",
+        log_config=None,
+    )
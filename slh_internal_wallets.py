@@ -1,13 +1,16 @@
 from decimal import Decimal, InvalidOperation
 from typing import Optional, Dict, Any, List, Tuple
 import os
-from datetime import datetime, timezone
 
 from db import db_cursor
 import logging
 
 logger = logging.getLogger("slhnet.internal_wallets")
 
+DEFAULT_TOKEN_PRICE_NIS = Decimal("444")
+DEFAULT_ENTRY_PRICE_NIS = Decimal("39")
+SLH_QUANTUM = Decimal("0.000000000000000001")  # 18 ספרות – כמו NUMERIC(36,18)
+
 
 def _to_decimal(val: Any, default: str = "0") -> Decimal:
     try:
@@ -26,10 +29,13 @@ def _get_token_price_nis() -> Decimal:
     ברירת מחדל: 444 ש״ח ל-1 SLH.
     ENV: SLH_TOKEN_PRICE_NIS
     """
+    raw = os.getenv("SLH_TOKEN_PRICE_NIS")
+    if not raw:
+        return DEFAULT_TOKEN_PRICE_NIS
     try:
-        return Decimal(os.getenv("SLH_TOKEN_PRICE_NIS", "444"))
+        return Decimal(raw)
     except (InvalidOperation, ValueError):
-        return Decimal("444")
+        return DEFAULT_TOKEN_PRICE_NIS
 
 
 def _get_entry_price_nis() -> Decimal:
@@ -37,10 +43,13 @@ def _get_entry_price_nis() -> Decimal:
     מחיר כניסה – תשלום בסיס בטלגרם (39 ש״ח כברירת מחדל).
     ENV: SLH_ENTRY_PRICE_NIS
     """
+    raw = os.getenv("SLH_ENTRY_PRICE_NIS")
+    if not raw:
+        return DEFAULT_ENTRY_PRICE_NIS
     try:
-        return Decimal(os.getenv("SLH_ENTRY_PRICE_NIS", "39"))
+        return Decimal(raw)
     except (InvalidOperation, ValueError):
-        return Decimal("39")
+        return DEFAULT_ENTRY_PRICE_NIS
 
 
 def init_internal_wallet_schema() -> None:
@@ -113,6 +122,32 @@ def init_internal_wallet_schema() -> None:
         logger.info("Internal wallet & staking schema ensured.")
 
 
+def _wallet_from_row(row) -> Dict[str, Any]:
+    return {
+        "wallet_id": row[0],
+        "user_id": row[1],
+        "username": row[2],
+        "balance_slh": _to_decimal(row[3]),
+        "created_at": row[4],
+        "updated_at": row[5],
+        "bsc_address": row[6],
+        "ton_address": row[7],
+    }
+
+
+def _stake_from_row(r) -> Dict[str, Any]:
+    return {
+        "id": r[0],
+        "amount_slh": _to_decimal(r[1]),
+        "apy": _to_decimal(r[2]),
+        "lock_days": r[3],
+        "status": r[4],
+        "started_at": r[5],
+        "last_reward_at": r[6],
+        "total_rewards_slh": _to_decimal(r[7]),
+    }
+
+
 def ensure_internal_wallet(user_id: int, username: Optional[str]) -> Dict[str, Any]:
     """
     יוצר (אם צריך) ומחזיר את ארנק המשתמש.
@@ -136,16 +171,7 @@ def ensure_internal_wallet(user_id: int, username: Optional[str]) -> Dict[str, A
         row = cur.fetchone()
         conn.commit()
 
-    return {
-        "wallet_id": row[0],
-        "user_id": row[1],
-        "username": row[2],
-        "balance_slh": _to_decimal(row[3]),
-        "created_at": row[4],
-        "updated_at": row[5],
-        "bsc_address": row[6],
-        "ton_address": row[7],
-    }
+    return _wallet_from_row(row)
 
 
 def get_wallet_overview(user_id: int) -> Optional[Dict[str, Any]]:
@@ -167,16 +193,52 @@ def get_wallet_overview(user_id: int) -> Optional[Dict[str, Any]]:
         if not row:
             return None
 
-        return {
-            "wallet_id": row[0],
-            "user_id": row[1],
-            "username": row[2],
-            "balance_slh": _to_decimal(row[3]),
-            "created_at": row[4],
-            "updated_at": row[5],
-            "bsc_address": row[6],
-            "ton_address": row[7],
-        }
+        return _wallet_from_row(row)
+
+
+def get_wallet_and_stakes(
+    user_id: int, username: Optional[str]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    יוצר (אם צריך) את ארנק המשתמש ומחזיר (ארנק, עמדות סטייקינג) –
+    בחיבור ובטרנזקציה אחת, במקום ensure + overview + stakes בנפרד.
+    username=None לא מוחק שם משתמש שכבר שמור.
+    סה"כ הסטייקינג מחושב ב-SQL (SUM OVER) ומוחזר בארנק כ-total_staked_slh.
+    """
+    with db_cursor() as (conn, cur):
+        if cur is None:
+            raise RuntimeError("DB not available")
+
+        cur.execute(
+            """
+            INSERT INTO internal_wallets (user_id, username)
+            VALUES (%s, %s)
+            ON CONFLICT (user_id) DO UPDATE
+              SET username = COALESCE(EXCLUDED.username, internal_wallets.username),
+                  updated_at = NOW()
+            RETURNING id, user_id, username, balance_slh, created_at, updated_at,
+                      bsc_address, ton_address;
+            """,
+            (user_id, username),
+        )
+        wallet_row = cur.fetchone()
+
+        cur.execute(
+            """
+            SELECT id, amount_slh, apy, lock_days, status, started_at, last_reward_at, total_rewards_slh,
+                   SUM(amount_slh) OVER () AS total_staked
+            FROM staking_positions
+            WHERE user_id = %s
+            ORDER BY started_at DESC;
+            """,
+            (user_id,),
+        )
+        stake_rows = cur.fetchall() or []
+        conn.commit()
+
+    wallet = _wallet_from_row(wallet_row)
+    wallet["total_staked_slh"] = _to_decimal(stake_rows[0][8] if stake_rows else None)
+    return wallet, [_stake_from_row(r) for r in stake_rows]
 
 
 def set_onchain_addresses(
@@ -306,10 +368,17 @@ def credit_wallet(
 
 def transfer_between_users(from_user_id: int, to_user_id: int, amount_slh: Decimal) -> Tuple[bool, str]:
     """
-    מעביר SLH פנימי בין שני משתמשים.
+    מעביר SLH פנימי בין שני משתמשים – בטרנזקציה אחת.
+    החיוב הוא UPDATE מותנה (balance_slh >= amount), כך שבדיקת היתרה והעדכון
+    אטומיים; שני הארנקים ננעלים לפי סדר user_id כדי ששתי העברות הפוכות
+    במקביל לא ינעלו זו את זו (deadlock).
     """
     if amount_slh <= 0:
         return False, "הסכום חייב להיות גדול מאפס."
+    if from_user_id == to_user_id:
+        return False, "לא ניתן להעביר לעצמך."
+
+    amount = str(amount_slh)
 
     with db_cursor() as (conn, cur):
         if cur is None:
@@ -317,68 +386,53 @@ def transfer_between_users(from_user_id: int, to_user_id: int, amount_slh: Decim
 
         # ודא שני ארנקים
         cur.execute(
-            "INSERT INTO internal_wallets (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING;",
-            (from_user_id,),
+            "INSERT INTO internal_wallets (user_id) VALUES (%s), (%s) ON CONFLICT (user_id) DO NOTHING;",
+            (from_user_id, to_user_id),
         )
+
+        # נעילת שני הארנקים בסדר קבוע
         cur.execute(
-            "INSERT INTO internal_wallets (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING;",
-            (to_user_id,),
+            "SELECT id FROM internal_wallets WHERE user_id IN (%s, %s) ORDER BY user_id FOR UPDATE;",
+            (from_user_id, to_user_id),
         )
 
-        # בדיקת יתרה
+        # חיוב השולח – רק אם יש מספיק יתרה
         cur.execute(
-            "SELECT id, balance_slh FROM internal_wallets WHERE user_id = %s FOR UPDATE;",
-            (from_user_id,),
+            """
+            UPDATE internal_wallets
+            SET balance_slh = balance_slh - %s, updated_at = NOW()
+            WHERE user_id = %s AND balance_slh >= %s
+            RETURNING id;
+            """,
+            (amount, from_user_id, amount),
         )
         row_from = cur.fetchone()
         if not row_from:
-            return False, "לא נמצא ארנק שולח."
-
-        from_wallet_id = row_from[0]
-        from_balance = _to_decimal(row_from[1])
-
-        if from_balance < amount_slh:
             return False, "אין מספיק יתרה בארנק."
+        from_wallet_id = row_from[0]
 
-        # נעילת ארנק מקבל
-        cur.execute(
-            "SELECT id, balance_slh FROM internal_wallets WHERE user_id = %s FOR UPDATE;",
-            (to_user_id,),
-        )
-        row_to = cur.fetchone()
-        if not row_to:
-            return False, "לא נמצא ארנק מקבל."
-
-        to_wallet_id = row_to[0]
-        to_balance = _to_decimal(row_to[1])
-
-        # עדכון יתרות
-        new_from = from_balance - amount_slh
-        new_to = to_balance + amount_slh
-
-        cur.execute(
-            "UPDATE internal_wallets SET balance_slh = %s, updated_at = NOW() WHERE id = %s;",
-            (str(new_from), from_wallet_id),
-        )
-        cur.execute(
-            "UPDATE internal_wallets SET balance_slh = %s, updated_at = NOW() WHERE id = %s;",
-            (str(new_to), to_wallet_id),
-        )
-
-        # ספר תנועות
+        # זיכוי המקבל
         cur.execute(
             """
-            INSERT INTO internal_wallet_ledger (wallet_id, change_slh, reason, ref_type, ref_id)
-            VALUES (%s, %s, %s, %s, %s);
+            UPDATE internal_wallets
+            SET balance_slh = COALESCE(balance_slh, 0) + %s, updated_at = NOW()
+            WHERE user_id = %s
+            RETURNING id;
             """,
-            (from_wallet_id, str(-amount_slh), f"transfer to user {to_user_id}", "transfer", to_user_id),
+            (amount, to_user_id),
         )
+        to_wallet_id = cur.fetchone()[0]
+
+        # ספר תנועות – שתי הרשומות בפקודה אחת
         cur.execute(
             """
             INSERT INTO internal_wallet_ledger (wallet_id, change_slh, reason, ref_type, ref_id)
-            VALUES (%s, %s, %s, %s, %s);
+            VALUES (%s, %s, %s, %s, %s), (%s, %s, %s, %s, %s);
             """,
-            (to_wallet_id, str(amount_slh), f"transfer from user {from_user_id}", "transfer", from_user_id),
+            (
+                from_wallet_id, str(-amount_slh), f"transfer to user {to_user_id}", "transfer", to_user_id,
+                to_wallet_id, amount, f"transfer from user {from_user_id}", "transfer", from_user_id,
+            ),
         )
 
         conn.commit()
@@ -467,21 +521,7 @@ def get_user_stakes(user_id: int) -> List[Dict[str, Any]]:
         )
         rows = cur.fetchall() or []
 
-    stakes: List[Dict[str, Any]] = []
-    for r in rows:
-        stakes.append(
-            {
-                "id": r[0],
-                "amount_slh": _to_decimal(r[1]),
-                "apy": _to_decimal(r[2]),
-                "lock_days": r[3],
-                "status": r[4],
-                "started_at": r[5],
-                "last_reward_at": r[6],
-                "total_rewards_slh": _to_decimal(r[7]),
-            }
-        )
-    return stakes
+    return [_stake_from_row(r) for r in rows]
 
 
 def mint_slh_from_payment(amount_nis: Decimal) -> Decimal:
@@ -492,7 +532,7 @@ def mint_slh_from_payment(amount_nis: Decimal) -> Decimal:
     price = _get_token_price_nis()
     if price <= 0:
         return Decimal("0")
-    return (amount_nis / price).quantize(Decimal("0.000000000000000001"))
+    return (amount_nis / price).quantize(SLH_QUANTUM)
 
 
 def credit_wallet_from_entry_price(